@@ -1,7 +1,13 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from hospital_booking.metrics import TimedSerializerMixin
 from .models import User
+from .tokens import revocation_store
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
@@ -44,8 +50,40 @@ class UserLoginSerializer(serializers.Serializer):
         
         return attrs
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'email', 'first_name', 'last_name', 'phone', 'role', 'is_verified', 'created_at')
-        read_only_fields = ('id', 'email', 'role', 'is_verified', 'created_at')
\ No newline at end of file
+        read_only_fields = ('id', 'email', 'role', 'is_verified', 'created_at')
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        jti = refresh[api_settings.JTI_CLAIM]
+
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            # Revoking is an atomic add, so of two concurrent refreshes with
+            # the same token only one gets a new pair.
+            if not revocation_store.revoke(jti, refresh['exp']):
+                raise InvalidToken('Token is blacklisted')
+        elif revocation_store.is_revoked(jti):
+            raise InvalidToken('Token is blacklisted')
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+
+        return data
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate_refresh(self, value):
+        try:
+            return RefreshToken(value)
+        except TokenError:
+            raise serializers.ValidationError('Invalid or expired refresh token')
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""Cache-backed JWT revocation with an in-memory Bloom filter in front.
+
+Revoked JTIs live in the cache until the token would have expired anyway.
+Every revocation is also appended to a log in the cache, one per expiry
+bucket, which each process replays into local Bloom filters at most every
+``SYNC_INTERVAL`` seconds. Only buckets that can still hold live tokens are
+read, so a new process never replays expired history. A lookup that misses
+the local filters, the common case, needs no network hop; only filter hits
+are confirmed against the cache.
+
+Filters are bucketed by token expiry, so cleanup is dropping buckets whose
+tokens have all expired.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationStore:
+    def __init__(self, options=None):
+        options = options or {}
+        self.prefix = options.get('KEY_PREFIX', 'jwt-revoked')
+        self.sync_interval = options.get('SYNC_INTERVAL', 1.0)
+        self.bucket_seconds = options.get('BUCKET_SECONDS', 6 * 60 * 60)
+        self.bucket_capacity = options.get('BUCKET_CAPACITY', 100000)
+        self.error_rate = options.get('ERROR_RATE', 0.001)
+        self.sync_batch = options.get('SYNC_BATCH', 1000)
+        self.max_token_lifetime = options.get('MAX_TOKEN_LIFETIME', 7 * 24 * 60 * 60)
+        self._buckets = {}
+        self._synced_seqs = {}
+        self._pending = set()
+        self._next_sync = 0.0
+        self._synced = False
+        self._syncing = False
+        self._lock = threading.Lock()
+
+    def _jti_key(self, jti):
+        return f'{self.prefix}:jti:{jti}'
+
+    # The log is kept per expiry bucket, each with its own sequence, so a
+    # process only ever replays buckets whose tokens can still be live.
+    def _log_key(self, bucket, seq):
+        return f'{self.prefix}:log:{bucket}:{seq}'
+
+    def _seq_key(self, bucket):
+        return f'{self.prefix}:seq:{bucket}'
+
+    def _live_buckets(self, now):
+        first = int(now) // self.bucket_seconds
+        last = int(now + self.max_token_lifetime) // self.bucket_seconds
+        return range(first, last + 1)
+
+    def _remember(self, jti, exp):
+        bucket = exp // self.bucket_seconds
+        bloom = self._buckets.get(bucket)
+        if bloom is None:
+            bloom = self._buckets[bucket] = BloomFilter(self.bucket_capacity, self.error_rate)
+        bloom.add(jti)
+
+    def revoke(self, jti, exp):
+        """Revoke ``jti`` until ``exp``. Returns False if it was already revoked."""
+        ttl = int(exp - time.time())
+        if ttl <= 0:
+            return True
+        if not cache.add(self._jti_key(jti), 1, timeout=ttl):
+            return False
+        bucket = exp // self.bucket_seconds
+        # The sequence outlives every token in its bucket, then goes away.
+        bucket_ttl = int((bucket + 1) * self.bucket_seconds - time.time()) + 60
+        cache.add(self._seq_key(bucket), 0, timeout=bucket_ttl)
+        seq = cache.incr(self._seq_key(bucket))
+        cache.set(self._log_key(bucket, seq), (jti, exp), timeout=ttl)
+        with self._lock:
+            self._remember(jti, exp)
+        return True
+
+    def is_revoked(self, jti):
+        self.sync()
+        with self._lock:
+            synced = self._synced
+            candidate = any(jti in bloom for bloom in self._buckets.values())
+        if candidate or not synced:
+            # Until this process has synced once, its filters prove nothing,
+            # so ask the cache rather than wait for the first sync.
+            return cache.get(self._jti_key(jti)) is not None
+        return False
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if self._syncing or (not force and now < self._next_sync):
+                return
+            self._syncing = True
+            self._next_sync = now + self.sync_interval
+            synced_seqs = dict(self._synced_seqs)
+            pending = set(self._pending)
+        # Network I/O happens outside the lock, so request threads keep
+        # checking against the filters they have while a sync runs.
+        try:
+            buckets = list(self._live_buckets(time.time()))
+            latest = cache.get_many([self._seq_key(bucket) for bucket in buckets])
+            seqs = {bucket: latest.get(self._seq_key(bucket), 0) for bucket in buckets}
+            # A sequence number can be allocated a moment before its log entry
+            # is written, so entries missing on one sync are retried once.
+            wanted = sorted(pending) + [
+                self._log_key(bucket, seq)
+                for bucket in buckets
+                for seq in range(synced_seqs.get(bucket, 0) + 1, seqs[bucket] + 1)
+            ]
+            found, missing = [], set()
+            for offset in range(0, len(wanted), self.sync_batch):
+                batch = wanted[offset:offset + self.sync_batch]
+                entries = cache.get_many(batch)
+                for key in batch:
+                    entry = entries.get(key)
+                    if entry is None:
+                        missing.add(key)
+                    else:
+                        found.append(entry)
+            with self._lock:
+                for entry in found:
+                    self._remember(*entry)
+                self._pending = missing - pending
+                self._synced_seqs = {
+                    bucket: max(seq, self._synced_seqs.get(bucket, 0)) for bucket, seq in seqs.items()
+                }
+                self._synced = True
+                self._cleanup(time.time())
+        finally:
+            with self._lock:
+                self._syncing = False
+
+    def cleanup(self):
+        with self._lock:
+            return self._cleanup(time.time())
+
+    def _cleanup(self, now):
+        expired = [bucket for bucket in self._buckets if (bucket + 1) * self.bucket_seconds <= now]
+        for bucket in expired:
+            del self._buckets[bucket]
+        return len(expired)
+
+
+revocation_store = RevocationStore(getattr(settings, 'JWT_REVOCATION', {}))
@@ -2,10 +2,12 @@ from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from .models import User
-from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer
+from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer, LogoutSerializer
+from .tokens import revocation_store
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -41,6 +43,23 @@ def login(request):
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout(request):
+    serializer = LogoutSerializer(data=request.data)
+    if serializer.is_valid():
+        refresh = serializer.validated_data['refresh']
+        if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(request.user.id):
+            return Response({'error': 'Token does not belong to this user'}, status=status.HTTP_403_FORBIDDEN)
+
+        revocation_store.revoke(refresh[api_settings.JTI_CLAIM], refresh['exp'])
+        if request.auth is not None:
+            revocation_store.revoke(request.auth[api_settings.JTI_CLAIM], request.auth['exp'])
+
+        return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
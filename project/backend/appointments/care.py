@@ -0,0 +1,134 @@
+"""Keeping CareRelation rows in step with appointments.
+
+New appointments bump the pair's counters under a row lock. Anything that can
+shrink a pair's history (cancellation, deletion, moving an appointment)
+recomputes the pair from its appointments, using the (doctor, patient) index,
+plus the appointments folded into the relation when old partitions were
+archived. Upcoming bookings count too, so last_appointment may be in the future.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Min
+from .models import Appointment, CareRelation
+
+UNCOUNTED_STATUSES = ('cancelled',)
+
+
+def is_counted(status):
+    return status not in UNCOUNTED_STATUSES
+
+
+def record_appointment(doctor_id, patient_id, appointment_date):
+    with transaction.atomic():
+        for _ in range(2):
+            relation = CareRelation.objects.select_for_update().filter(
+                doctor_id=doctor_id, patient_id=patient_id
+            ).first()
+            if relation is not None:
+                relation.first_appointment = min(relation.first_appointment, appointment_date)
+                relation.last_appointment = max(relation.last_appointment, appointment_date)
+                relation.appointment_count += 1
+                relation.save(update_fields=['first_appointment', 'last_appointment', 'appointment_count', 'updated_at'])
+                return relation
+            try:
+                with transaction.atomic():
+                    return CareRelation.objects.create(
+                        doctor_id=doctor_id, patient_id=patient_id,
+                        first_appointment=appointment_date, last_appointment=appointment_date, appointment_count=1,
+                    )
+            except IntegrityError:
+                # A concurrent booking created the row first; lock and bump it.
+                continue
+
+
+def with_archived(stats, archived_first, archived_last, archived_count):
+    """Add a relation's archived appointments to stats computed from appointments."""
+    if not archived_count:
+        return stats
+    if not stats['appointment_count']:
+        return {'first_appointment': archived_first, 'last_appointment': archived_last, 'appointment_count': archived_count}
+    return {
+        'first_appointment': min(stats['first_appointment'], archived_first),
+        'last_appointment': max(stats['last_appointment'], archived_last),
+        'appointment_count': stats['appointment_count'] + archived_count,
+    }
+
+
+def refresh_relation(doctor_id, patient_id):
+    with transaction.atomic():
+        relation = CareRelation.objects.select_for_update().filter(
+            doctor_id=doctor_id, patient_id=patient_id
+        ).first()
+        stats = Appointment.objects.filter(
+            doctor_id=doctor_id, patient_id=patient_id
+        ).exclude(status__in=UNCOUNTED_STATUSES).aggregate(
+            first_appointment=Min('appointment_date'),
+            last_appointment=Max('appointment_date'),
+            appointment_count=Count('id'),
+        )
+        if relation is not None:
+            stats = with_archived(
+                stats, relation.archived_first_appointment, relation.archived_last_appointment, relation.archived_appointment_count
+            )
+        if not stats['appointment_count']:
+            if relation is not None:
+                relation.delete()
+            return None
+        if relation is None:
+            relation, _ = CareRelation.objects.update_or_create(
+                doctor_id=doctor_id, patient_id=patient_id, defaults=stats
+            )
+            return relation
+        for field, value in stats.items():
+            setattr(relation, field, value)
+        relation.save(update_fields=['first_appointment', 'last_appointment', 'appointment_count', 'updated_at'])
+        return relation
+
+
+def rebuild_relations(doctor_ids=None, batch_size=5000):
+    """Recompute every CareRelation (or those of ``doctor_ids``) from scratch."""
+    appointments = Appointment.objects.exclude(status__in=UNCOUNTED_STATUSES)
+    relations = CareRelation.objects.all()
+    if doctor_ids is not None:
+        appointments = appointments.filter(doctor_id__in=doctor_ids)
+        relations = relations.filter(doctor_id__in=doctor_ids)
+
+    rows = appointments.values('doctor_id', 'patient_id').annotate(
+        first_appointment=Min('appointment_date'),
+        last_appointment=Max('appointment_date'),
+        appointment_count=Count('id'),
+    ).order_by().iterator(chunk_size=batch_size)
+
+    def build(archived):
+        for row in rows:
+            first, last, count = archived.pop((row['doctor_id'], row['patient_id']), (None, None, 0))
+            yield row, first, last, count
+        # Pairs whose appointments were all archived
+        for (doctor_id, patient_id), (first, last, count) in archived.items():
+            yield {'doctor_id': doctor_id, 'patient_id': patient_id, 'appointment_count': 0}, first, last, count
+
+    created = 0
+    with transaction.atomic():
+        archived = {
+            (doctor_id, patient_id): (first, last, count)
+            for doctor_id, patient_id, first, last, count in relations.filter(archived_appointment_count__gt=0).values_list(
+                'doctor_id', 'patient_id', 'archived_first_appointment', 'archived_last_appointment', 'archived_appointment_count'
+            )
+        }
+        relations.delete()
+        batch = []
+        for row, first, last, count in build(archived):
+            stats = with_archived(
+                {key: row.get(key) for key in ('first_appointment', 'last_appointment', 'appointment_count')}, first, last, count
+            )
+            batch.append(CareRelation(
+                doctor_id=row['doctor_id'], patient_id=row['patient_id'], **stats,
+                archived_first_appointment=first, archived_last_appointment=last, archived_appointment_count=count,
+            ))
+            if len(batch) >= batch_size:
+                CareRelation.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            CareRelation.objects.bulk_create(batch)
+            created += len(batch)
+    return created
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SLOT_TAKEN = 'slot.taken'
+SLOT_FREED = 'slot.freed'
+RESYNC = 'resync'
+
+
+class Subscription:
+    """A single open stream, bound to the event loop that created it."""
+
+    def __init__(self, broker, doctor_id, start_date, end_date, max_queue):
+        self.broker = broker
+        self.doctor_id = doctor_id
+        self.start_date = start_date.isoformat()
+        self.end_date = end_date.isoformat()
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def matches(self, event):
+        return self.start_date <= event['date'] <= self.end_date
+
+    def deliver(self, event):
+        # A client that cannot keep up gets told to refetch availability
+        # instead of letting its queue grow without bound.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {'type': RESYNC, 'doctor_id': self.doctor_id}
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fans events out to the streams open in this process only."""
+
+    def __init__(self, options):
+        self.max_queue = options.get('MAX_QUEUE', 100)
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, doctor_id, start_date, end_date):
+        subscription = Subscription(self, doctor_id, start_date, end_date, self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(doctor_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.doctor_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.doctor_id]
+
+    def publish(self, event):
+        self.dispatch(event)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(event['doctor_id'], ()))
+        for subscription in subscribers:
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The loop serving this stream has shut down.
+                self.unsubscribe(subscription)
+
+
+class RedisBroker(InProcessBroker):
+    """Publishes through Redis so every worker sees every booking.
+
+    Each worker holds one pattern subscription per event loop and fans the
+    messages out locally, so open streams do not cost a Redis connection each.
+    """
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.url = options.get('URL', 'redis://localhost:6379/1')
+        self.channel_prefix = options.get('CHANNEL_PREFIX', 'slot-events:')
+        self._client = None
+        self._listeners = {}
+
+    def publish(self, event):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(f"{self.channel_prefix}{event['doctor_id']}", json.dumps(event))
+
+    def subscribe(self, doctor_id, start_date, end_date):
+        subscription = super().subscribe(doctor_id, start_date, end_date)
+        loop = subscription.loop
+        with self._lock:
+            listener = self._listeners.get(loop)
+            if listener is None or listener.done():
+                self._listeners[loop] = loop.create_task(self._listen())
+        return subscription
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+
+        while True:
+            client = aioredis.Redis.from_url(self.url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f'{self.channel_prefix}*')
+                async for message in pubsub.listen():
+                    if message['type'] == 'pmessage':
+                        self.dispatch(json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Slot event listener lost its Redis connection, reconnecting')
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+                await client.close()
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        options = getattr(settings, 'SLOT_EVENTS', {})
+        backend = import_string(options.get('BACKEND', 'appointments.events.InProcessBroker'))
+        _broker = backend(options)
+    return _broker
+
+
+def publish_slot_event(event_type, doctor_id, appointment_date, start_time, end_time):
+    event = {
+        'type': event_type,
+        'doctor_id': doctor_id,
+        'date': appointment_date.isoformat(),
+        'start_time': start_time.strftime('%H:%M'),
+        'end_time': end_time.strftime('%H:%M'),
+    }
+
+    def send():
+        try:
+            get_broker().publish(event)
+        except Exception:
+            logger.exception('Failed to publish %s for doctor %s', event_type, doctor_id)
+
+    # Only announce changes that actually made it to the database.
+    transaction.on_commit(send)
@@ -0,0 +1,237 @@
+import gzip
+import os
+import re
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from appointments.care import UNCOUNTED_STATUSES
+from appointments.models import Appointment, CareRelation
+
+TABLE = Appointment._meta.db_table
+LEGACY_TABLE = f'{TABLE}_legacy'
+DEFAULT_PARTITION = f'{TABLE}_default'
+SEQUENCE = f'{TABLE}_pk_seq'
+PARTITION_RE = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Manage monthly range partitions of the appointments table by appointment_date (PostgreSQL). '
+        '"convert" turns the existing table into a partitioned one, "create" adds upcoming partitions, '
+        '"archive" detaches old partitions and writes them to gzipped CSV, "list" shows partitions.'
+    )
+
+    def add_arguments(self, parser):
+        options = getattr(settings, 'APPOINTMENT_PARTITIONS', {})
+        parser.add_argument('action', choices=['convert', 'create', 'archive', 'list'])
+        parser.add_argument('--months-ahead', type=int, default=options.get('MONTHS_AHEAD', 6),
+                            help='convert/create: partitions to keep ready beyond the current month')
+        parser.add_argument('--older-than-months', type=int, default=options.get('ARCHIVE_AFTER_MONTHS', 24),
+                            help='archive: archive partitions that ended more than this many months ago')
+        parser.add_argument('--archive-dir', default=options.get('ARCHIVE_DIR', 'archive/appointments'),
+                            help='archive: where to write <partition>.csv.gz files')
+        parser.add_argument('--keep-detached', action='store_true',
+                            help='archive: keep detached tables instead of dropping them after export')
+        parser.add_argument('--drop-legacy', action='store_true',
+                            help='convert: drop the original table once its rows are copied')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Appointment partitioning requires PostgreSQL')
+        getattr(self, options['action'])(options)
+
+    def run(self, sql, params=None):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def fetch(self, sql, params=None):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def is_partitioned(self):
+        rows = self.fetch("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        return bool(rows) and rows[0][0] == 'p'
+
+    def partitions(self):
+        rows = self.fetch("""
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+        """, [TABLE])
+        months = []
+        for (name,) in rows:
+            match = PARTITION_RE.match(name)
+            if match:
+                months.append(date(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(months)
+
+    def create_partition(self, month):
+        """Create the partition for ``month``, moving any rows parked in the default partition."""
+        name = partition_name(month)
+        upper = add_months(month, 1)
+        with transaction.atomic():
+            self.run(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+            self.run(
+                f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+                f'WHERE appointment_date >= %s AND appointment_date < %s RETURNING *) '
+                f'INSERT INTO "{name}" SELECT * FROM moved',
+                [month, upper],
+            )
+            self.run(
+                f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+                [month.isoformat(), upper.isoformat()],
+            )
+        self.stdout.write(f'Created partition {name}')
+
+    def convert(self, options):
+        if self.is_partitioned():
+            raise CommandError(f'{TABLE} is already partitioned')
+
+        with transaction.atomic():
+            self.run(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+            first, max_id = self.fetch(f'SELECT MIN(appointment_date), MAX(id) FROM "{TABLE}"')[0]
+            first = month_start(first or date.today())
+            last = add_months(month_start(date.today()), options['months_ahead'])
+
+            self.run(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY_TABLE}"')
+            # Free the index and constraint names for the partitioned table.
+            for (index,) in self.fetch("SELECT indexname FROM pg_indexes WHERE tablename = %s", [LEGACY_TABLE]):
+                self.run(f'ALTER INDEX "{index}" RENAME TO "{index[:55]}_legacy"')
+            # Primary and unique keys of a partitioned table must include the
+            # partition column; ids stay unique through the shared sequence.
+            self.run(f'''
+                CREATE TABLE "{TABLE}" (LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS)
+                PARTITION BY RANGE (appointment_date)
+            ''')
+            self.run(f'CREATE SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}".id')
+            self.run(f'''ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval('"{SEQUENCE}"')''')
+            self.run("SELECT setval(%s, %s)", [f'"{SEQUENCE}"', max_id or 1])
+            self.run(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+            month = first
+            while month <= last:
+                self.run(
+                    f'CREATE TABLE "{partition_name(month)}" PARTITION OF "{TABLE}" FOR VALUES FROM (%s) TO (%s)',
+                    [month.isoformat(), add_months(month, 1).isoformat()],
+                )
+                month = add_months(month, 1)
+
+            columns = ', '.join(f'"{field.column}"' for field in Appointment._meta.concrete_fields)
+            self.run(f'INSERT INTO "{TABLE}" ({columns}) SELECT {columns} FROM "{LEGACY_TABLE}"')
+
+            self.run(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, appointment_date)')
+            # Same partial key as the model's appointment_one_active_per_slot;
+            # it contains appointment_date, so Postgres accepts it here.
+            self.run(
+                f'CREATE UNIQUE INDEX "appointment_one_active_per_slot" ON "{TABLE}" '
+                f"(doctor_id, appointment_date, start_time) WHERE status IN ('pending', 'confirmed')"
+            )
+            for field in ('doctor', 'patient'):
+                related = Appointment._meta.get_field(field).related_model._meta.db_table
+                self.run(
+                    f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_{field}_id_fk" '
+                    f'FOREIGN KEY ({field}_id) REFERENCES "{related}" (id) DEFERRABLE INITIALLY DEFERRED'
+                )
+            for index in Appointment._meta.indexes:
+                columns_sql = ', '.join(
+                    f'"{Appointment._meta.get_field(name.lstrip("-")).column}"' + (' DESC' if name.startswith('-') else '')
+                    for name in index.fields
+                )
+                self.run(f'CREATE INDEX "{index.name}" ON "{TABLE}" ({columns_sql})')
+            self.run(f'CREATE INDEX "{TABLE}_patient_id_idx" ON "{TABLE}" (patient_id)')
+
+            if options['drop_legacy']:
+                self.run(f'DROP TABLE "{LEGACY_TABLE}"')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Partitioned {TABLE} by month from {first:%Y-%m} to {last:%Y-%m}'
+        ))
+        if not options['drop_legacy']:
+            self.stdout.write(f'The original rows are kept in {LEGACY_TABLE}; drop it once verified.')
+
+    def create(self, options):
+        if not self.is_partitioned():
+            raise CommandError(f'{TABLE} is not partitioned yet; run "convert" first')
+        existing = set(self.partitions())
+        month = month_start(date.today())
+        last = add_months(month, options['months_ahead'])
+        created = 0
+        while month <= last:
+            if month not in existing:
+                self.create_partition(month)
+                created += 1
+            month = add_months(month, 1)
+        self.stdout.write(self.style.SUCCESS(f'{created} partitions created'))
+
+    def archive(self, options):
+        if not self.is_partitioned():
+            raise CommandError(f'{TABLE} is not partitioned yet; run "convert" first')
+        cutoff = add_months(month_start(date.today()), -options['older_than_months'])
+        os.makedirs(options['archive_dir'], exist_ok=True)
+
+        for month in self.partitions():
+            if add_months(month, 1) > cutoff:
+                continue
+            name = partition_name(month)
+            path = os.path.join(options['archive_dir'], f'{name}.csv.gz')
+            with transaction.atomic():
+                self.run(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+                with connection.cursor() as cursor, gzip.open(path, 'wt', encoding='utf-8') as archive:
+                    cursor.copy_expert(f'COPY "{name}" TO STDOUT WITH (FORMAT csv, HEADER)', archive)
+                self.fold_into_care_relations(name)
+                if not options['keep_detached']:
+                    self.run(f'DROP TABLE "{name}"')
+            self.stdout.write(f'Archived {name} to {path}')
+
+    def fold_into_care_relations(self, name):
+        """Keep the partition's appointments in care relations once its rows are gone.
+
+        The archived_* columns are what refresh_relation and
+        rebuild_care_relations add back to the counts they take from the
+        appointments table.
+        """
+        care = CareRelation._meta.db_table
+        self.run(f'''
+            INSERT INTO "{care}" AS care (
+                doctor_id, patient_id, first_appointment, last_appointment, appointment_count,
+                archived_first_appointment, archived_last_appointment, archived_appointment_count, updated_at
+            )
+            SELECT doctor_id, patient_id, MIN(appointment_date), MAX(appointment_date), COUNT(*),
+                   MIN(appointment_date), MAX(appointment_date), COUNT(*), NOW()
+            FROM "{name}"
+            WHERE status <> ALL(%s)
+            GROUP BY doctor_id, patient_id
+            ON CONFLICT (doctor_id, patient_id) DO UPDATE SET
+                archived_first_appointment = LEAST(care.archived_first_appointment, EXCLUDED.archived_first_appointment),
+                archived_last_appointment = GREATEST(care.archived_last_appointment, EXCLUDED.archived_last_appointment),
+                archived_appointment_count = care.archived_appointment_count + EXCLUDED.archived_appointment_count,
+                updated_at = NOW()
+        ''', [list(UNCOUNTED_STATUSES)])
+
+    def list(self, options):
+        if not self.is_partitioned():
+            self.stdout.write(f'{TABLE} is not partitioned')
+            return
+        for month in self.partitions():
+            name = partition_name(month)
+            count = self.fetch(f'SELECT COUNT(*) FROM "{name}"')[0][0]
+            self.stdout.write(f'{name}  {month:%Y-%m}  {count} rows')
+        count = self.fetch(f'SELECT COUNT(*) FROM "{DEFAULT_PARTITION}"')[0][0]
+        self.stdout.write(f'{DEFAULT_PARTITION}  (outside monthly ranges)  {count} rows')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from appointments.care import rebuild_relations
+
+
+class Command(BaseCommand):
+    help = 'Recompute doctor-patient care relations from appointments (after bulk loads or imports)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctor', type=int, action='append', dest='doctor_ids',
+                            help='Only rebuild this doctor; may be repeated')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        created = rebuild_relations(options['doctor_ids'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} care relations'))
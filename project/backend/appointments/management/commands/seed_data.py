@@ -0,0 +1,261 @@
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from accounts.models import User
+from appointments.care import rebuild_relations
+from appointments.models import Appointment, CareRelation
+from doctors.models import Doctor, ScheduleException, TimeSlot
+from patients.models import Patient
+from waitlist.models import SlotOffer, WaitlistEntry, WaitlistRequest
+
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Amelia', 'Ananya', 'Arjun', 'Benjamin', 'Chloe', 'Daniel', 'Divya', 'Emma',
+    'Ethan', 'Fatima', 'Grace', 'Hannah', 'Ishaan', 'Isabella', 'James', 'Kavya', 'Liam', 'Lucas',
+    'Maya', 'Meera', 'Mia', 'Noah', 'Olivia', 'Priya', 'Rahul', 'Riya', 'Rohan', 'Sara',
+    'Sofia', 'Tanvi', 'Vikram', 'William', 'Zara',
+]
+LAST_NAMES = [
+    'Agarwal', 'Brown', 'Chen', 'Das', 'Davis', 'Garcia', 'Gupta', 'Iyer', 'Johnson', 'Khan',
+    'Kumar', 'Lee', 'Martin', 'Mehta', 'Miller', 'Nair', 'Patel', 'Reddy', 'Rao', 'Shah',
+    'Sharma', 'Singh', 'Smith', 'Taylor', 'Thomas', 'Verma', 'Wilson',
+]
+SPECIALIZATIONS = [
+    'Cardiology', 'Dermatology', 'Endocrinology', 'ENT', 'Gastroenterology', 'General Medicine',
+    'Gynecology', 'Nephrology', 'Neurology', 'Oncology', 'Ophthalmology', 'Orthopedics',
+    'Pediatrics', 'Psychiatry', 'Pulmonology', 'Urology',
+]
+QUALIFICATIONS = ['MBBS', 'MBBS, MD', 'MBBS, MS', 'MBBS, DNB', 'MBBS, MD, DM', 'MBBS, MS, MCh']
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+ALLERGIES = ['penicillin', 'sulfa drugs', 'aspirin', 'latex', 'peanuts', 'shellfish', 'pollen', 'dust mites']
+CONDITIONS = [
+    'hypertension', 'type 2 diabetes', 'asthma', 'hypothyroidism', 'migraine', 'osteoarthritis',
+    'GERD', 'anxiety', 'hyperlipidemia', 'chronic kidney disease',
+]
+REASONS = [
+    'Routine check-up', 'Follow-up visit', 'Persistent headache', 'Chest pain', 'Skin rash',
+    'Joint pain', 'Fever and cough', 'Blood pressure review', 'Medication review', 'Lab results discussion',
+]
+# Weekly templates as (day_of_week, start, end); day 0 is Sunday, as in TimeSlot.
+SCHEDULE_TEMPLATES = [
+    [(d, time(9), time(13)) for d in range(1, 6)] + [(d, time(14), time(17)) for d in range(1, 6)],
+    [(d, time(10), time(14)) for d in (1, 3, 5)] + [(6, time(9), time(12))],
+    [(d, time(8), time(12)) for d in range(1, 7)],
+    [(d, time(15), time(19)) for d in (2, 4, 6)],
+]
+SLOT_MINUTES = 30
+PASSWORD = 'seed-password'
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate realistic users, doctors, patients, time slots and appointments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=100)
+        parser.add_argument('--patients', type=int, default=2000)
+        parser.add_argument('--appointments', type=int, default=50000)
+        parser.add_argument('--past-days', type=int, default=365)
+        parser.add_argument('--future-days', type=int, default=60)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, so runs are repeatable')
+        parser.add_argument('--prefix', default='seed', help='Email/username prefix for generated users')
+        parser.add_argument('--flush', action='store_true', help='Delete previously seeded users first')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.prefix = options['prefix']
+        self.password = make_password(PASSWORD)
+
+        if options['flush']:
+            self.flush()
+
+        doctors = self.create_doctors(options['doctors'])
+        patient_ids = self.create_patients(options['patients'])
+        schedules = self.create_time_slots(doctors)
+        self.create_appointments(
+            schedules, patient_ids, options['appointments'],
+            options['past_days'], options['future_days'],
+        )
+        # bulk_create skips the signals that maintain care relations
+        relations = rebuild_relations([doctor.id for doctor in doctors], self.chunk_size)
+        self.stdout.write(f'Rebuilt {relations} care relations')
+        self.stdout.write(self.style.SUCCESS(f'Seeded data; every seeded user has the password "{PASSWORD}"'))
+
+    def flush(self):
+        """Delete previously seeded users and everything that hangs off them.
+
+        Appointments, slots and schedule exceptions have delete signals
+        (slot events, waitlist backfill, care relations, schedule cache), so
+        a cascading ORM delete would load every row and fire them all. They
+        go first with plain DELETE statements; the users' own cascade is
+        then left with tables that have no receivers.
+        """
+        email = f'{self.prefix}.'
+        seeded_doctor = Q(doctor__user__email__startswith=email)
+        seeded_patient = Q(patient__user__email__startswith=email)
+        deleted = 0
+        with transaction.atomic():
+            for model, condition in (
+                (SlotOffer, seeded_doctor | seeded_patient),
+                (WaitlistEntry, seeded_doctor | Q(request__patient__user__email__startswith=email)),
+                (WaitlistRequest, seeded_doctor | seeded_patient),
+                (CareRelation, seeded_doctor | seeded_patient),
+                (Appointment, seeded_doctor | seeded_patient),
+                (ScheduleException, seeded_doctor),
+                (TimeSlot, seeded_doctor),
+            ):
+                deleted += self.raw_delete(model.objects.filter(condition))
+            users, _ = User.objects.filter(email__startswith=email).delete()
+        self.stdout.write(f'Deleted {deleted + users} previously seeded rows')
+
+    def raw_delete(self, queryset):
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE id IN ({sql})', params)
+            return cursor.rowcount
+
+    def bulk_create(self, model, objects):
+        created = []
+        for chunk in chunked(objects, self.chunk_size):
+            with transaction.atomic():
+                created.extend(model.objects.bulk_create(chunk))
+        return created
+
+    def build_users(self, role, count):
+        for i in range(count):
+            first_name = self.rng.choice(FIRST_NAMES)
+            last_name = self.rng.choice(LAST_NAMES)
+            username = f'{self.prefix}.{role}{i}'
+            yield User(
+                username=username,
+                email=f'{username}@example.com',
+                first_name=first_name,
+                last_name=last_name,
+                phone=f'9{self.rng.randrange(10 ** 9):09d}',
+                role=role,
+                is_verified=True,
+                password=self.password,
+            )
+
+    def create_doctors(self, count):
+        users = self.bulk_create(User, self.build_users('doctor', count))
+        doctors = self.bulk_create(Doctor, (
+            Doctor(
+                user_id=user.id,
+                specialization=self.rng.choice(SPECIALIZATIONS),
+                experience=self.rng.randint(1, 35),
+                qualifications=self.rng.choice(QUALIFICATIONS),
+                consultation_fee=Decimal(self.rng.randrange(300, 2500, 50)),
+                bio=f'Consultant with a focus on {self.rng.choice(CONDITIONS)}.',
+            )
+            for user in users
+        ))
+        self.stdout.write(f'Created {len(doctors)} doctors')
+        return doctors
+
+    def create_patients(self, count):
+        users = self.bulk_create(User, self.build_users('patient', count))
+        today = date.today()
+        patients = self.bulk_create(Patient, (
+            Patient(
+                user_id=user.id,
+                date_of_birth=today - timedelta(days=self.rng.randint(365, 90 * 365)),
+                blood_group=self.rng.choice(BLOOD_GROUPS),
+                allergies=', '.join(self.rng.sample(ALLERGIES, self.rng.randint(0, 2))) or None,
+                medical_history=', '.join(self.rng.sample(CONDITIONS, self.rng.randint(0, 3))) or None,
+                emergency_contact=f'8{self.rng.randrange(10 ** 9):09d}',
+            )
+            for user in users
+        ))
+        self.stdout.write(f'Created {len(patients)} patients')
+        return [patient.id for patient in patients]
+
+    def create_time_slots(self, doctors):
+        schedules = {}
+        slots = []
+        for doctor in doctors:
+            template = self.rng.choice(SCHEDULE_TEMPLATES)
+            schedules[doctor.id] = template
+            slots.extend(
+                TimeSlot(doctor_id=doctor.id, day_of_week=day, start_time=start, end_time=end)
+                for day, start, end in template
+            )
+        self.bulk_create(TimeSlot, slots)
+        self.stdout.write(f'Created {len(slots)} weekly time slots')
+        return schedules
+
+    def day_starts(self, template):
+        starts = {}
+        for day, start, end in template:
+            current = datetime.combine(date.min, start)
+            limit = datetime.combine(date.min, end)
+            while current + timedelta(minutes=SLOT_MINUTES) <= limit:
+                starts.setdefault(day, []).append(current.time())
+                current += timedelta(minutes=SLOT_MINUTES)
+        return starts
+
+    def create_appointments(self, schedules, patient_ids, target, past_days, future_days):
+        today = date.today()
+        days = [today + timedelta(days=offset) for offset in range(-past_days, future_days + 1)]
+        starts = {doctor_id: self.day_starts(template) for doctor_id, template in schedules.items()}
+
+        capacity = sum(
+            len(starts[doctor_id].get((day.weekday() + 1) % 7, ()))
+            for doctor_id in starts for day in days
+        )
+        if not capacity or not patient_ids:
+            self.stdout.write('No schedule capacity or patients; skipping appointments')
+            return
+        fill_rate = min(1.0, target / capacity)
+
+        def build():
+            produced = 0
+            for day in days:
+                day_of_week = (day.weekday() + 1) % 7
+                past = day < today
+                for doctor_id, doctor_starts in starts.items():
+                    for start in doctor_starts.get(day_of_week, ()):
+                        if produced >= target:
+                            return
+                        if self.rng.random() >= fill_rate:
+                            continue
+                        end = (datetime.combine(day, start) + timedelta(minutes=SLOT_MINUTES)).time()
+                        if past:
+                            status = self.rng.choices(('completed', 'cancelled'), weights=(85, 15))[0]
+                        else:
+                            status = self.rng.choices(('pending', 'confirmed', 'cancelled'), weights=(30, 60, 10))[0]
+                        produced += 1
+                        yield Appointment(
+                            patient_id=self.rng.choice(patient_ids),
+                            doctor_id=doctor_id,
+                            appointment_date=day,
+                            start_time=start,
+                            end_time=end,
+                            status=status,
+                            reason=self.rng.choice(REASONS),
+                        )
+
+        created = 0
+        for chunk in chunked(build(), self.chunk_size):
+            with transaction.atomic():
+                Appointment.objects.bulk_create(chunk)
+            created += len(chunk)
+            if created % (self.chunk_size * 20) == 0:
+                self.stdout.write(f'  {created} appointments...')
+        self.stdout.write(f'Created {created} appointments')
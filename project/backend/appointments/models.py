@@ -23,8 +23,21 @@ class Appointment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        unique_together = ['doctor', 'appointment_date', 'start_time']
         ordering = ['-appointment_date', '-start_time']
+        constraints = [
+            # Only active appointments hold a slot; a cancelled row must not
+            # keep it from being booked again.
+            models.UniqueConstraint(
+                fields=['doctor', 'appointment_date', 'start_time'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='appointment_one_active_per_slot',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['doctor', 'appointment_date']),
+            models.Index(fields=['doctor', 'patient']),
+            models.Index(fields=['patient', '-appointment_date']),
+        ]
 
     def __str__(self):
         return f"{self.patient.user.full_name} - Dr. {self.doctor.user.full_name} on {self.appointment_date}"
@@ -34,4 +47,31 @@ class Appointment(models.Model):
         from datetime import datetime, timedelta
         start = datetime.combine(self.appointment_date, self.start_time)
         end = datetime.combine(self.appointment_date, self.end_time)
-        return int((end - start).total_seconds() / 60)
\ No newline at end of file
+        return int((end - start).total_seconds() / 60)
+
+class CareRelation(models.Model):
+    """A doctor-patient pair with at least one non-cancelled appointment.
+
+    Maintained from Appointment writes (see appointments/care.py) so the
+    doctor's patient roster is a plain indexed filter instead of a DISTINCT
+    over every appointment the doctor ever had. The dates and count cover
+    upcoming bookings as well as past visits.
+    """
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='care_relations')
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='care_relations')
+    first_appointment = models.DateField()
+    last_appointment = models.DateField()
+    appointment_count = models.PositiveIntegerField(default=0)
+    # Appointments archived out of the appointments table
+    # (appointment_partitions archive); recomputes add them back in.
+    archived_appointment_count = models.PositiveIntegerField(default=0)
+    archived_first_appointment = models.DateField(null=True, blank=True)
+    archived_last_appointment = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['doctor', 'patient']
+        indexes = [models.Index(fields=['doctor', '-last_appointment'])]
+
+    def __str__(self):
+        return f"Dr. {self.doctor.user.full_name} - {self.patient.user.full_name} ({self.appointment_count} appointments)"
\ No newline at end of file
@@ -1,9 +1,13 @@
 from rest_framework import serializers
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from doctors.serializers import DoctorSerializer
 from patients.serializers import PatientSerializer
+from hospital_booking.metrics import TimedSerializerMixin
+from waitlist.models import SlotOffer
 from .models import Appointment
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     patient = PatientSerializer(read_only=True)
     doctor = DoctorSerializer(read_only=True)
     patient_id = serializers.IntegerField(write_only=True)
@@ -49,14 +53,49 @@ class AppointmentSerializer(serializers.ModelSerializer):
         return attrs
 
 class AppointmentCreateSerializer(serializers.ModelSerializer):
+    doctor_id = serializers.IntegerField()
+
     class Meta:
         model = Appointment
         fields = ['doctor_id', 'appointment_date', 'start_time', 'end_time', 'reason']
 
+    def validate(self, attrs):
+        user = self.context['request'].user
+
+        # Check for conflicting appointments
+        conflicting_appointments = Appointment.objects.filter(
+            doctor_id=attrs['doctor_id'],
+            appointment_date=attrs['appointment_date'],
+            start_time__lt=attrs['end_time'],
+            end_time__gt=attrs['start_time'],
+            status__in=['pending', 'confirmed']
+        )
+        if conflicting_appointments.exists():
+            raise serializers.ValidationError("This time slot is already booked")
+
+        # Slots freed by a cancellation may be held for a waitlisted patient
+        held_for_others = SlotOffer.objects.filter(
+            doctor_id=attrs['doctor_id'],
+            appointment_date=attrs['appointment_date'],
+            start_time__lt=attrs['end_time'],
+            end_time__gt=attrs['start_time'],
+            status='held',
+            expires_at__gt=timezone.now()
+        ).exclude(patient__user=user)
+        if held_for_others.exists():
+            raise serializers.ValidationError("This time slot is currently held for a waitlisted patient")
+
+        return attrs
+
     def create(self, validated_data):
         # Get patient from request user
         user = self.context['request'].user
         from patients.models import Patient
         patient = Patient.objects.get(user=user)
         validated_data['patient'] = patient
-        return super().create(validated_data)
\ No newline at end of file
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            # Lost a race with another booking of the same slot
+            raise serializers.ValidationError("This time slot is already booked")
\ No newline at end of file
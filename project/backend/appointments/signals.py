@@ -0,0 +1,91 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
+from django.dispatch import Signal, receiver
+from .models import Appointment
+from .care import is_counted, record_appointment, refresh_relation
+from .events import SLOT_TAKEN, SLOT_FREED, publish_slot_event
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+# Sent after commit whenever an active appointment stops holding its slot,
+# with doctor_id, appointment_date, start_time and end_time.
+slot_freed = Signal()
+
+
+def _free_slot(doctor_id, appointment_date, start_time, end_time):
+    publish_slot_event(SLOT_FREED, doctor_id, appointment_date, start_time, end_time)
+    transaction.on_commit(lambda: slot_freed.send(
+        sender=Appointment, doctor_id=doctor_id, appointment_date=appointment_date,
+        start_time=start_time, end_time=end_time,
+    ))
+
+
+def _held_slot(doctor_id, appointment_date, start_time, end_time, status):
+    if status not in ACTIVE_STATUSES:
+        return None
+    return (doctor_id, appointment_date, start_time, end_time)
+
+
+def _booking(doctor_id, patient_id, appointment_date, status):
+    return (doctor_id, patient_id, appointment_date, is_counted(status))
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_previous_state(sender, instance, **kwargs):
+    instance._previous_slot = None
+    instance._previous_booking = None
+    if instance.pk:
+        previous = Appointment.objects.filter(pk=instance.pk).values_list(
+            'doctor_id', 'patient_id', 'appointment_date', 'start_time', 'end_time', 'status'
+        ).first()
+        if previous:
+            doctor_id, patient_id, appointment_date, start_time, end_time, status = previous
+            instance._previous_slot = _held_slot(doctor_id, appointment_date, start_time, end_time, status)
+            instance._previous_booking = _booking(doctor_id, patient_id, appointment_date, status)
+
+
+@receiver(post_save, sender=Appointment)
+def announce_slot_change(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_slot', None)
+    current = _held_slot(
+        instance.doctor_id, instance.appointment_date,
+        instance.start_time, instance.end_time, instance.status
+    )
+    if previous == current:
+        return
+    if previous:
+        _free_slot(*previous)
+    if current:
+        publish_slot_event(SLOT_TAKEN, *current)
+
+
+@receiver(post_delete, sender=Appointment)
+def announce_slot_freed(sender, instance, **kwargs):
+    freed = _held_slot(
+        instance.doctor_id, instance.appointment_date,
+        instance.start_time, instance.end_time, instance.status
+    )
+    if freed:
+        _free_slot(*freed)
+
+
+
+@receiver(post_save, sender=Appointment)
+def update_care_relation(sender, instance, created, **kwargs):
+    current = _booking(instance.doctor_id, instance.patient_id, instance.appointment_date, instance.status)
+    previous = getattr(instance, '_previous_booking', None)
+    if created or previous is None:
+        if current[3]:
+            record_appointment(instance.doctor_id, instance.patient_id, instance.appointment_date)
+        return
+    if previous == current:
+        return
+    refresh_relation(previous[0], previous[1])
+    if previous[:2] != current[:2]:
+        refresh_relation(current[0], current[1])
+
+
+@receiver(post_delete, sender=Appointment)
+def forget_care_appointment(sender, instance, **kwargs):
+    if is_counted(instance.status):
+        refresh_relation(instance.doctor_id, instance.patient_id)
\ No newline at end of file
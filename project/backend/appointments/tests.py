@@ -0,0 +1,73 @@
+import asyncio
+from datetime import date, timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import User
+from doctors.models import Doctor
+from patients.models import Patient
+from .events import SLOT_FREED, SLOT_TAKEN, InProcessBroker
+from .models import Appointment
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SlotEventTests(TestCase):
+    def setUp(self):
+        doctor_user = User.objects.create_user(
+            email='doctor@example.com', username='doctor', password='password',
+            first_name='Grace', last_name='Lee', role='doctor',
+        )
+        self.doctor = Doctor.objects.create(
+            user=doctor_user, specialization='Cardiology', experience=10,
+            qualifications='MBBS, MD', consultation_fee=500,
+        )
+        self.patient_user = User.objects.create_user(
+            email='patient@example.com', username='patient', password='password',
+            first_name='Liam', last_name='Shah', role='patient',
+        )
+        Patient.objects.create(user=self.patient_user, date_of_birth=date(1990, 1, 1))
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient_user)
+        self.day = date.today() + timedelta(days=7)
+
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.broker = InProcessBroker({})
+        self.subscription = self.loop.run_until_complete(self._subscribe())
+        self.addCleanup(self.subscription.close)
+
+    async def _subscribe(self):
+        return self.broker.subscribe(self.doctor.id, self.day, self.day)
+
+    def next_event(self):
+        return self.loop.run_until_complete(self.subscription.get(timeout=1))
+
+    @mock.patch('waitlist.signals.offer_freed_slot')
+    @mock.patch('appointments.views.send_appointment_confirmation')
+    def test_booking_and_cancelling_publish_slot_events(self, send_confirmation, offer_freed_slot):
+        with mock.patch('appointments.events._broker', self.broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/appointments/', {
+                    'doctor_id': self.doctor.id,
+                    'appointment_date': self.day.isoformat(),
+                    'start_time': '10:00',
+                    'end_time': '10:30',
+                    'reason': 'Routine check-up',
+                }, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+            appointment = Appointment.objects.get(doctor=self.doctor, appointment_date=self.day)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(f'/api/appointments/{appointment.id}/cancel/')
+            self.assertEqual(response.status_code, 200, response.data)
+
+        expected = {
+            'doctor_id': self.doctor.id,
+            'date': self.day.isoformat(),
+            'start_time': '10:00',
+            'end_time': '10:30',
+        }
+        self.assertEqual(self.next_event(), dict(expected, type=SLOT_TAKEN))
+        self.assertEqual(self.next_event(), dict(expected, type=SLOT_FREED))
+        offer_freed_slot.delay.assert_called_once()
@@ -3,15 +3,23 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.db.models import Q
+from django.utils.decorators import method_decorator
+from hospital_booking.idempotency import idempotent
 from .models import Appointment
 from .serializers import AppointmentSerializer, AppointmentCreateSerializer
 from notifications.tasks import send_appointment_confirmation, send_appointment_reminder
+from datetime import date, timedelta
 
 class AppointmentListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['status', 'appointment_date']
+    # Date bounds let Postgres prune to the matching monthly partitions.
+    filterset_fields = {
+        'status': ['exact'],
+        'appointment_date': ['exact', 'gte', 'lte'],
+    }
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -31,9 +39,20 @@ class AppointmentListCreateView(generics.ListCreateAPIView):
         elif user.role == 'admin':
             # Admins can see all appointments
             pass
+
+        # Without a date bound the list would read every monthly partition;
+        # older history is still there when asked for with explicit bounds.
+        params = self.request.query_params
+        if not any(key in params for key in ('appointment_date', 'appointment_date__gte', 'appointment_date__lte')):
+            history_days = getattr(settings, 'APPOINTMENT_PARTITIONS', {}).get('LIST_HISTORY_DAYS', 365)
+            queryset = queryset.filter(appointment_date__gte=date.today() - timedelta(days=history_days))
         
         return queryset.order_by('-appointment_date', '-start_time')
 
+    @method_decorator(idempotent)
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         appointment = serializer.save()
         # Send confirmation email asynchronously
@@ -82,6 +101,7 @@ def cancel_appointment(request, appointment_id):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def send_confirmation(request, appointment_id):
     try:
         appointment = Appointment.objects.get(id=appointment_id)
@@ -92,6 +112,7 @@ def send_confirmation(request, appointment_id):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def send_reminder(request, appointment_id):
     try:
         appointment = Appointment.objects.get(id=appointment_id)
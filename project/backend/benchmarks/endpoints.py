@@ -0,0 +1,212 @@
+"""Latency and query-count benchmark for the key API endpoints.
+
+Runs against whatever database the settings point at, so seed it first:
+
+    python manage.py seed_data --doctors 10000 --patients 200000 --appointments 5000000
+    python benchmarks/endpoints.py --iterations 200 --output before.json
+    # ...change something...
+    python benchmarks/endpoints.py --iterations 200 --output after.json --compare before.json
+
+Requests go through Django's test client in-process, so the numbers include
+middleware, views and serializers but no network or WSGI server. Writes
+(booking) run inside a transaction that is rolled back after each request,
+without queueing the confirmation email.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_booking.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from doctors.models import Doctor, TimeSlot  # noqa: E402
+
+SEED_PASSWORD = 'seed-password'
+SAMPLE_SIZE = 200
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Benchmark:
+    def __init__(self, rng):
+        self.rng = rng
+        self.client = Client(SERVER_NAME='localhost', raise_request_exception=False)
+        self.patients = self.sample_users(User.objects.filter(role='patient', patient__isnull=False))
+        self.doctor_users = self.sample_users(User.objects.filter(role='doctor', doctor__isnull=False))
+        if not self.patients or not self.doctor_users:
+            raise SystemExit('No patients or doctors found; run "manage.py seed_data" first')
+        self.doctors = list(Doctor.objects.filter(user__in=self.doctor_users).values('id', 'specialization'))
+        self.slots = list(TimeSlot.objects.filter(doctor_id__in=[d['id'] for d in self.doctors]).values(
+            'doctor_id', 'day_of_week', 'start_time'
+        ))
+        self.tokens = {}
+
+    def sample_users(self, queryset):
+        # Sampled with the seeded RNG, so runs with the same --seed hit the
+        # same users and --compare compares like with like.
+        ids = list(queryset.order_by('id').values_list('id', flat=True))
+        sample = sorted(self.rng.sample(ids, min(SAMPLE_SIZE, len(ids))))
+        return list(User.objects.filter(id__in=sample).order_by('id'))
+
+    def auth(self, user):
+        if user.id not in self.tokens:
+            self.tokens[user.id] = f'Bearer {RefreshToken.for_user(user).access_token}'
+        return {'HTTP_AUTHORIZATION': self.tokens[user.id]}
+
+    def login(self):
+        user = self.rng.choice(self.patients)
+        return self.client.post(
+            '/api/auth/login/', {'email': user.email, 'password': SEED_PASSWORD},
+            content_type='application/json',
+        )
+
+    def doctor_search(self):
+        doctor = self.rng.choice(self.doctors)
+        return self.client.get(
+            '/api/doctors/', {'specialization': doctor['specialization'], 'ordering': 'consultation_fee'},
+            **self.auth(self.rng.choice(self.patients)),
+        )
+
+    def availability(self):
+        doctor = self.rng.choice(self.doctors)
+        day = date.today() + timedelta(days=self.rng.randint(0, 30))
+        return self.client.get(
+            f"/api/doctors/{doctor['id']}/availability/", {'date': day.isoformat()},
+            **self.auth(self.rng.choice(self.patients)),
+        )
+
+    def booking(self):
+        slot = self.rng.choice(self.slots)
+        offset = (slot['day_of_week'] - (date.today().weekday() + 1)) % 7
+        day = date.today() + timedelta(days=offset + 7 * self.rng.randint(1, 8))
+        start = slot['start_time']
+        end = (start.hour * 60 + start.minute + 30)
+        payload = {
+            'doctor_id': slot['doctor_id'],
+            'appointment_date': day.isoformat(),
+            'start_time': start.strftime('%H:%M'),
+            'end_time': f'{end // 60:02d}:{end % 60:02d}',
+            'reason': 'Benchmark booking',
+        }
+        # Keep broker latency out of the numbers: the confirmation task is
+        # not queued, and the booking is rolled back anyway.
+        with transaction.atomic(), mock.patch('appointments.views.send_appointment_confirmation'):
+            response = self.client.post(
+                '/api/appointments/', payload, content_type='application/json',
+                **self.auth(self.rng.choice(self.patients)),
+            )
+            transaction.set_rollback(True)
+        return response
+
+    def patient_appointments(self):
+        return self.client.get('/api/appointments/', **self.auth(self.rng.choice(self.patients)))
+
+    def doctor_appointments(self):
+        return self.client.get('/api/appointments/', **self.auth(self.rng.choice(self.doctor_users)))
+
+
+SCENARIOS = ['login', 'doctor_search', 'availability', 'booking', 'patient_appointments', 'doctor_appointments']
+
+
+def run_scenario(benchmark, name, iterations, warmup):
+    action = getattr(benchmark, name)
+    for _ in range(warmup):
+        action()
+
+    latencies = []
+    queries = []
+    errors = 0
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = action()
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured.captured_queries))
+        if response.status_code >= 400:
+            errors += 1
+
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'queries_mean': round(statistics.fmean(queries), 1),
+        'queries_max': max(queries),
+    }
+
+
+def print_report(results, baseline=None):
+    header = f"{'scenario':<22} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'errors':>7}"
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        print(f"{name:<22} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9} "
+              f"{result['queries_mean']:>8} {result['errors']:>7}")
+        previous = (baseline or {}).get(name)
+        if previous:
+            deltas = []
+            for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+                if previous[key]:
+                    deltas.append(f'{(result[key] - previous[key]) / previous[key] * 100:+.1f}%')
+                else:
+                    deltas.append('n/a')
+            query_delta = result['queries_mean'] - previous['queries_mean']
+            print(f"{'  vs baseline':<22} {deltas[0]:>9} {deltas[1]:>9} {deltas[2]:>9} {query_delta:>+8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1, help='Random seed, so runs pick the same inputs')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Baseline JSON file from an earlier run')
+    args = parser.parse_args()
+
+    benchmark = Benchmark(random.Random(args.seed))
+    results = {}
+    for name in args.scenarios:
+        benchmark.rng.seed(f'{args.seed}-{name}')
+        results[name] = run_scenario(benchmark, name, args.iterations, args.warmup)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'iterations': args.iterations,
+                'seed': args.seed,
+                'vendor': connection.vendor,
+                'results': results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Request throughput with file logging disabled, synchronous and queued.
+
+Drives POST /api/auth/login/ with an empty body through Django's test client
+from several threads. Each request is rejected with a 400, which Django logs
+as a warning on ``django.request``, so every request produces one file record
+without touching the database.
+
+    python benchmarks/logging_throughput.py --requests 5000 --threads 8
+"""
+import argparse
+import json
+import logging
+import logging.config
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_booking.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import Client  # noqa: E402
+
+URL = '/api/auth/login/'
+
+
+def logging_config(mode, log_dir):
+    handlers = {}
+    if mode == 'sync':
+        handlers['file'] = {
+            'class': 'logging.FileHandler',
+            'filename': os.path.join(log_dir, 'sync.log'),
+            'formatter': 'json',
+        }
+    elif mode == 'queued':
+        handlers['file'] = {
+            '()': 'hospital_booking.log.QueuedFileHandler',
+            'filename': os.path.join(log_dir, 'queued.log'),
+            'formatter': 'json',
+        }
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {'json': {'()': 'hospital_booking.log.JsonFormatter'}},
+        'handlers': handlers,
+        'root': {'handlers': list(handlers), 'level': 'INFO'},
+        # Drop Django's default console handler (it writes every 4xx to stderr
+        # under DEBUG), so the modes differ only in their file output.
+        'loggers': {
+            'django': {'handlers': [], 'propagate': True},
+            'django.request': {'propagate': True},
+        },
+    }
+
+
+def run(mode, total_requests, threads, log_dir):
+    logging.config.dictConfig(logging_config(mode, log_dir))
+    per_thread = total_requests // threads
+
+    def worker():
+        client = Client(SERVER_NAME='localhost')
+        for _ in range(per_thread):
+            client.post(URL, data={}, content_type='application/json')
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # Include the time it takes the background writer to drain, so the
+    # queued numbers are not flattered by records still in memory.
+    drain_start = time.perf_counter()
+    for handler in logging.getLogger().handlers:
+        handler.close()
+    drain = time.perf_counter() - drain_start
+
+    completed = per_thread * threads
+    return {
+        'mode': mode,
+        'requests': completed,
+        'threads': threads,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(completed / elapsed, 1),
+        'drain_seconds': round(drain, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--modes', nargs='+', default=['none', 'sync', 'queued'], choices=['none', 'sync', 'queued'])
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix='logbench-')
+    try:
+        # Warm up URL resolution and imports before timing anything.
+        run('none', args.threads * 10, args.threads, log_dir)
+        results = [run(mode, args.requests, args.threads, log_dir) for mode in args.modes]
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<8} {'requests':>9} {'req/s':>10} {'seconds':>9} {'drain s':>9}")
+    for result in results:
+        print(f"{result['mode']:<8} {result['requests']:>9} {result['requests_per_second']:>10} "
+              f"{result['seconds']:>9} {result['drain_seconds']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import heapq
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from appointments.models import Appointment
+from waitlist.models import SlotOffer
+from .schedule import get_schedules
+
+SLOT_MINUTES = 30
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+
+def slot_times(day, intervals, booked=(), not_before=None):
+    """Yield (start, end, free) 30-minute slots for ``day``.
+
+    ``intervals`` are sorted (start_time, end_time) working hours and
+    ``booked`` sorted (start_time, end_time) appointments on that day.
+    """
+    step = timedelta(minutes=SLOT_MINUTES)
+    booked = [(datetime.combine(day, start), datetime.combine(day, end)) for start, end in booked]
+    index = 0
+    for interval_start, interval_end in intervals:
+        current = datetime.combine(day, interval_start)
+        limit = datetime.combine(day, interval_end)
+        while current < limit:
+            slot_end = current + step
+            while index < len(booked) and booked[index][1] <= current:
+                index += 1
+            free = not (index < len(booked) and booked[index][0] < slot_end)
+            if not_before is not None and current < not_before:
+                free = False
+            yield current, slot_end, free
+            current = slot_end
+
+
+def free_slots(day, intervals, booked=(), not_before=None):
+    for start, end, free in slot_times(day, intervals, booked, not_before):
+        if free:
+            yield start, end
+
+
+def booked_intervals(doctor_ids, first_day, last_day):
+    """Active appointments and waitlist holds of ``doctor_ids`` in the range.
+
+    Two queries regardless of the number of doctors; ``doctor_ids`` may be a
+    list or a queryset of doctor ids.
+    """
+    appointments = Appointment.objects.filter(
+        doctor_id__in=doctor_ids,
+        appointment_date__range=(first_day, last_day),
+        status__in=ACTIVE_STATUSES,
+    ).values_list('doctor_id', 'appointment_date', 'start_time', 'end_time')
+    holds = SlotOffer.objects.filter(
+        doctor_id__in=doctor_ids,
+        appointment_date__range=(first_day, last_day),
+        status='held',
+        expires_at__gt=timezone.now(),
+    ).values_list('doctor_id', 'appointment_date', 'start_time', 'end_time')
+    booked = defaultdict(list)
+    for rows in (appointments, holds):
+        for doctor_id, appointment_date, start_time, end_time in rows:
+            booked[doctor_id, appointment_date].append((start_time, end_time))
+    for intervals in booked.values():
+        intervals.sort()
+    return booked
+
+
+def next_available(doctor_ids, first_day, horizon_days, limit, not_before=None, window_days=7):
+    """Earliest free slots across ``doctor_ids``, in time order.
+
+    Compiled schedules come from the cache (missing ones are compiled in two
+    queries) and appointments load once per ``window_days``, so the query
+    count depends on the horizon, not on the number of doctors.
+    Each day's per-doctor free-slot streams are merged lazily with a heap, and
+    loading stops as soon as ``limit`` slots have been found.
+    """
+    doctor_ids = list(doctor_ids)
+    schedules = get_schedules(doctor_ids)
+    results = []
+    for offset in range(0, horizon_days, window_days):
+        window = [first_day + timedelta(days=offset + i) for i in range(min(window_days, horizon_days - offset))]
+        booked = booked_intervals(doctor_ids, window[0], window[-1])
+        for day in window:
+            streams = []
+            for doctor_id in doctor_ids:
+                intervals = schedules[doctor_id].intervals_for(day)
+                if intervals:
+                    streams.append(
+                        (start, doctor_id, end) for start, end in free_slots(
+                            day, intervals, booked.get((doctor_id, day), ()), not_before
+                        )
+                    )
+            for start, doctor_id, end in heapq.merge(*streams):
+                results.append((doctor_id, start, end))
+                if len(results) >= limit:
+                    return results
+    return results
@@ -38,4 +38,27 @@ class TimeSlot(models.Model):
         unique_together = ['doctor', 'day_of_week', 'start_time']
 
     def __str__(self):
-        return f"{self.doctor.user.full_name} - {self.get_day_of_week_display()} {self.start_time}-{self.end_time}"
\ No newline at end of file
+        return f"{self.doctor.user.full_name} - {self.get_day_of_week_display()} {self.start_time}-{self.end_time}"
+
+class ScheduleException(models.Model):
+    KIND_CHOICES = [
+        ('unavailable', 'Unavailable'),
+        ('extra', 'Extra hours'),
+    ]
+
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='schedule_exceptions')
+    date = models.DateField()
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES, default='unavailable')
+    start_time = models.TimeField(blank=True, null=True, help_text="Leave empty with end_time to block the whole day")
+    end_time = models.TimeField(blank=True, null=True)
+    reason = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        indexes = [models.Index(fields=['doctor', 'date'])]
+
+    def __str__(self):
+        hours = f"{self.start_time}-{self.end_time}" if self.start_time else 'all day'
+        return f"{self.doctor.user.full_name} - {self.get_kind_display()} on {self.date} ({hours})"
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""Compiled doctor schedules.
+
+A doctor's weekly TimeSlots are merged into sorted, non-overlapping intervals
+per weekday, and their ScheduleExceptions into a map keyed by date. Expanding
+working hours for a day is then a dict lookup plus a small interval merge.
+
+Compiled schedules are cached under a per-doctor version number. Writes to
+TimeSlot or ScheduleException bump the version once their transaction
+commits, so a schedule compiled from pre-commit data is never served again.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models import ScheduleException, TimeSlot
+
+CACHE_PREFIX = 'doctor-schedule'
+CACHE_TIMEOUT = 24 * 60 * 60
+# Exceptions older than this are not compiled in; nothing books that far back.
+EXCEPTION_LOOKBACK_DAYS = 31
+
+
+def day_of_week(day):
+    # TimeSlot.day_of_week counts from Sunday (0) to Saturday (6).
+    return (day.weekday() + 1) % 7
+
+
+def merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(intervals, removed):
+    result = []
+    for start, end in intervals:
+        pieces = [(start, end)]
+        for cut_start, cut_end in removed:
+            next_pieces = []
+            for piece_start, piece_end in pieces:
+                if cut_end <= piece_start or cut_start >= piece_end:
+                    next_pieces.append((piece_start, piece_end))
+                    continue
+                if piece_start < cut_start:
+                    next_pieces.append((piece_start, cut_start))
+                if cut_end < piece_end:
+                    next_pieces.append((cut_end, piece_end))
+            pieces = next_pieces
+        result.extend(pieces)
+    return result
+
+
+class CompiledSchedule:
+    def __init__(self, weekly, exceptions):
+        # weekly[day_of_week] -> tuple of (start_time, end_time), Sunday first.
+        self.weekly = weekly
+        # exceptions[date] -> (closed_all_day, removed_intervals, extra_intervals)
+        self.exceptions = exceptions
+
+    def intervals_for(self, day):
+        intervals = self.weekly[day_of_week(day)]
+        exception = self.exceptions.get(day)
+        if exception is None:
+            return intervals
+        closed, removed, extra = exception
+        if closed:
+            intervals = ()
+        elif removed:
+            intervals = subtract_intervals(intervals, removed)
+        if extra:
+            intervals = merge_intervals(list(intervals) + list(extra))
+        return tuple(intervals)
+
+    def expand(self, first_day, last_day):
+        day = first_day
+        while day <= last_day:
+            yield day, self.intervals_for(day)
+            day += timedelta(days=1)
+
+
+def compile_schedules(doctor_ids):
+    """Build CompiledSchedules for ``doctor_ids`` with two queries in total."""
+    weekly = defaultdict(lambda: [[] for _ in range(7)])
+    for doctor_id, day_of_week, start_time, end_time in TimeSlot.objects.filter(
+        doctor_id__in=doctor_ids, is_available=True
+    ).values_list('doctor_id', 'day_of_week', 'start_time', 'end_time'):
+        weekly[doctor_id][day_of_week].append((start_time, end_time))
+
+    exceptions = defaultdict(lambda: defaultdict(lambda: [False, [], []]))
+    for doctor_id, day, kind, start_time, end_time in ScheduleException.objects.filter(
+        doctor_id__in=doctor_ids, date__gte=date.today() - timedelta(days=EXCEPTION_LOOKBACK_DAYS)
+    ).values_list('doctor_id', 'date', 'kind', 'start_time', 'end_time'):
+        entry = exceptions[doctor_id][day]
+        if kind == 'extra':
+            entry[2].append((start_time, end_time))
+        elif start_time is None:
+            entry[0] = True
+        else:
+            entry[1].append((start_time, end_time))
+
+    compiled = {}
+    for doctor_id in doctor_ids:
+        days = weekly.get(doctor_id) or [[] for _ in range(7)]
+        compiled[doctor_id] = CompiledSchedule(
+            tuple(tuple(merge_intervals(intervals)) for intervals in days),
+            {
+                day: (closed, tuple(merge_intervals(removed)), tuple(merge_intervals(extra)))
+                for day, (closed, removed, extra) in exceptions.get(doctor_id, {}).items()
+            },
+        )
+    return compiled
+
+
+def _version_key(doctor_id):
+    return f'{CACHE_PREFIX}:{doctor_id}:version'
+
+
+def _schedule_key(doctor_id, version):
+    return f'{CACHE_PREFIX}:{doctor_id}:v{version}'
+
+
+def get_schedules(doctor_ids):
+    """Compiled schedules for ``doctor_ids``, compiling only cache misses."""
+    doctor_ids = list(doctor_ids)
+    if not doctor_ids:
+        return {}
+    versions = cache.get_many([_version_key(doctor_id) for doctor_id in doctor_ids])
+    keys = {doctor_id: _schedule_key(doctor_id, versions.get(_version_key(doctor_id), 0)) for doctor_id in doctor_ids}
+    cached = cache.get_many(list(keys.values()))
+
+    schedules = {doctor_id: cached[key] for doctor_id, key in keys.items() if key in cached}
+    missing = [doctor_id for doctor_id in doctor_ids if doctor_id not in schedules]
+    if missing:
+        compiled = compile_schedules(missing)
+        cache.set_many({keys[doctor_id]: compiled[doctor_id] for doctor_id in missing}, timeout=CACHE_TIMEOUT)
+        schedules.update(compiled)
+    return schedules
+
+
+def get_schedule(doctor_id):
+    return get_schedules([doctor_id])[doctor_id]
+
+
+def invalidate_schedule(doctor_id):
+    def bump():
+        cache.add(_version_key(doctor_id), 0, timeout=None)
+        cache.incr(_version_key(doctor_id))
+
+    transaction.on_commit(bump)
+
+
+
+def replace_weekly_schedule(doctor, slots):
+    """Make ``doctor``'s TimeSlots exactly ``slots``, writing only the difference.
+
+    Slots are matched on (day_of_week, start_time), the model's unique key.
+    Must run inside a transaction with the Doctor row locked (select_for_update),
+    so concurrent replacements cannot both insert the same new slot; returns
+    counts per kind of change.
+    """
+    existing = {
+        (slot.day_of_week, slot.start_time): slot
+        for slot in TimeSlot.objects.select_for_update().filter(doctor=doctor)
+    }
+    now = timezone.now()
+    to_create, to_update = [], []
+    for data in slots:
+        key = (data['day_of_week'], data['start_time'])
+        is_available = data.get('is_available', True)
+        slot = existing.pop(key, None)
+        if slot is None:
+            to_create.append(TimeSlot(
+                doctor=doctor,
+                day_of_week=data['day_of_week'],
+                start_time=data['start_time'],
+                end_time=data['end_time'],
+                is_available=is_available,
+            ))
+        elif slot.end_time != data['end_time'] or slot.is_available != is_available:
+            slot.end_time = data['end_time']
+            slot.is_available = is_available
+            slot.updated_at = now
+            to_update.append(slot)
+
+    if existing:
+        TimeSlot.objects.filter(id__in=[slot.id for slot in existing.values()]).delete()
+    if to_update:
+        TimeSlot.objects.bulk_update(to_update, ['end_time', 'is_available', 'updated_at'])
+    if to_create:
+        TimeSlot.objects.bulk_create(to_create)
+
+    # Bulk writes skip model signals, so invalidate the cached schedule here.
+    invalidate_schedule(doctor.id)
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(existing),
+        'unchanged': len(slots) - len(to_create) - len(to_update),
+    }
+
+
+def outside_schedule(schedule, appointments):
+    """The appointments whose time is not fully within ``schedule``'s hours."""
+    outside = []
+    for appointment in appointments:
+        intervals = schedule.intervals_for(appointment.appointment_date)
+        if not any(
+            start <= appointment.start_time and appointment.end_time <= end
+            for start, end in intervals
+        ):
+            outside.append(appointment)
+    return outside
\ No newline at end of file
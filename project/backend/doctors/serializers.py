@@ -1,15 +1,39 @@
 from rest_framework import serializers
 from accounts.serializers import UserProfileSerializer
-from .models import Doctor, TimeSlot
+from hospital_booking.metrics import TimedSerializerMixin
+from .models import Doctor, TimeSlot, ScheduleException
 
-class TimeSlotSerializer(serializers.ModelSerializer):
+class TimeSlotSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     day_name = serializers.CharField(source='get_day_of_week_display', read_only=True)
     
     class Meta:
         model = TimeSlot
         fields = ['id', 'day_of_week', 'day_name', 'start_time', 'end_time', 'is_available']
 
-class DoctorSerializer(serializers.ModelSerializer):
+class WeeklyScheduleSerializer(serializers.Serializer):
+    slots = TimeSlotSerializer(many=True)
+
+    def validate_slots(self, slots):
+        by_day = {}
+        for slot in slots:
+            if slot['start_time'] >= slot['end_time']:
+                raise serializers.ValidationError(
+                    f"{slot['start_time']}-{slot['end_time']}: end_time must be after start_time"
+                )
+            by_day.setdefault(slot['day_of_week'], []).append(slot)
+
+        for day, day_slots in by_day.items():
+            day_slots.sort(key=lambda slot: slot['start_time'])
+            for previous, current in zip(day_slots, day_slots[1:]):
+                if current['start_time'] < previous['end_time']:
+                    raise serializers.ValidationError(
+                        f"Overlapping slots on {TimeSlot(day_of_week=day).get_day_of_week_display()}: "
+                        f"{previous['start_time']}-{previous['end_time']} and "
+                        f"{current['start_time']}-{current['end_time']}"
+                    )
+        return slots
+
+class DoctorSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserProfileSerializer(read_only=True)
     time_slots = TimeSlotSerializer(many=True, read_only=True)
     rating = serializers.SerializerMethodField()
@@ -34,4 +58,25 @@ class DoctorSerializer(serializers.ModelSerializer):
 class DoctorCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Doctor
-        fields = ['specialization', 'experience', 'qualifications', 'consultation_fee', 'bio', 'is_available']
\ No newline at end of file
+        fields = ['specialization', 'experience', 'qualifications', 'consultation_fee', 'bio', 'is_available']
+
+class ScheduleExceptionSerializer(serializers.ModelSerializer):
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+
+    class Meta:
+        model = ScheduleException
+        fields = ['id', 'date', 'kind', 'kind_display', 'start_time', 'end_time', 'reason', 'created_at']
+
+    def validate(self, attrs):
+        kind = attrs.get('kind', getattr(self.instance, 'kind', 'unavailable'))
+        start_time = attrs.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = attrs.get('end_time', getattr(self.instance, 'end_time', None))
+
+        if (start_time is None) != (end_time is None):
+            raise serializers.ValidationError("Provide both start_time and end_time, or neither for a whole day")
+        if kind == 'extra' and start_time is None:
+            raise serializers.ValidationError("Extra hours need a start_time and end_time")
+        if start_time is not None and start_time >= end_time:
+            raise serializers.ValidationError("end_time must be after start_time")
+
+        return attrs
\ No newline at end of file
@@ -3,7 +3,11 @@ from . import views
 
 urlpatterns = [
     path('', views.DoctorListView.as_view(), name='doctor-list'),
+    path('next-available/', views.next_available_slots, name='doctor-next-available'),
     path('<int:pk>/', views.DoctorDetailView.as_view(), name='doctor-detail'),
     path('<int:doctor_id>/availability/', views.doctor_availability, name='doctor-availability'),
+    path('<int:doctor_id>/slot-events/', views.doctor_slot_events, name='doctor-slot-events'),
     path('time-slots/', views.TimeSlotListCreateView.as_view(), name='time-slot-list-create'),
+    path('schedule-exceptions/', views.ScheduleExceptionListCreateView.as_view(), name='schedule-exception-list-create'),
+    path('schedule-exceptions/<int:pk>/', views.ScheduleExceptionDetailView.as_view(), name='schedule-exception-detail'),
 ]
\ No newline at end of file
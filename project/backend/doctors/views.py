@@ -2,11 +2,25 @@ from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied, ValidationError
+from accounts.authentication import RevocableJWTAuthentication
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
 from django.db.models import Q
-from .models import Doctor, TimeSlot
-from .serializers import DoctorSerializer, TimeSlotSerializer
-from datetime import datetime, timedelta
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+from appointments.events import get_broker
+from .availability import ACTIVE_STATUSES, booked_intervals, next_available, slot_times
+from .schedule import compile_schedules, get_schedule, outside_schedule, replace_weekly_schedule
+from .models import Doctor, TimeSlot, ScheduleException
+from .serializers import DoctorSerializer, TimeSlotSerializer, ScheduleExceptionSerializer, WeeklyScheduleSerializer
+from datetime import date as date_cls, datetime
+import asyncio
+import json
 
 class DoctorListView(generics.ListAPIView):
     queryset = Doctor.objects.filter(is_available=True).select_related('user')
@@ -36,29 +50,16 @@ def doctor_availability(request, doctor_id):
         except ValueError:
             return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get day of week (0=Sunday, 6=Saturday)
-        day_of_week = (date.weekday() + 1) % 7
-        
-        # Get doctor's time slots for this day
-        time_slots = TimeSlot.objects.filter(
-            doctor=doctor,
-            day_of_week=day_of_week,
-            is_available=True
-        )
-        
-        # TODO: Check for existing appointments and remove booked slots
-        available_slots = []
-        for slot in time_slots:
-            # Generate 30-minute intervals within the time slot
-            current_time = datetime.combine(date, slot.start_time)
-            end_time = datetime.combine(date, slot.end_time)
-            
-            while current_time < end_time:
-                available_slots.append({
-                    'time': current_time.strftime('%H:%M'),
-                    'available': True  # TODO: Check against existing appointments
-                })
-                current_time += timedelta(minutes=30)
+        # Working hours for this day, including leave and extra clinics
+        intervals = get_schedule(doctor.id).intervals_for(date)
+
+        booked = booked_intervals([doctor.id], date, date).get((doctor.id, date), ())
+
+        # 30-minute intervals within the time slots, minus booked ones
+        available_slots = [
+            {'time': start.strftime('%H:%M'), 'available': free}
+            for start, end, free in slot_times(date, intervals, booked)
+        ]
         
         return Response({
             'date': date_str,
@@ -69,6 +70,58 @@ def doctor_availability(request, doctor_id):
     except Doctor.DoesNotExist:
         return Response({'error': 'Doctor not found'}, status=status.HTTP_404_NOT_FOUND)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def next_available_slots(request):
+    specialization = request.GET.get('specialization')
+    if not specialization:
+        return Response({'error': 'specialization parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        horizon_days = min(int(request.GET.get('days', 14)), 90)
+        limit = min(int(request.GET.get('limit', 5)), 50)
+        max_fee = request.GET.get('max_fee')
+        min_experience = request.GET.get('min_experience')
+        start_date = datetime.strptime(request.GET['date'], '%Y-%m-%d').date() if 'date' in request.GET else date_cls.today()
+    except ValueError:
+        return Response({'error': 'Invalid parameters. days and limit must be integers, date YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    if horizon_days < 1 or limit < 1:
+        return Response({'error': 'days and limit must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+    doctors = Doctor.objects.filter(is_available=True, specialization__iexact=specialization)
+    try:
+        if max_fee:
+            doctors = doctors.filter(consultation_fee__lte=max_fee)
+        if min_experience:
+            doctors = doctors.filter(experience__gte=int(min_experience))
+    except (ValueError, DjangoValidationError):
+        return Response({'error': 'Invalid max_fee or min_experience'}, status=status.HTTP_400_BAD_REQUEST)
+    doctors = {doctor.id: doctor for doctor in doctors.select_related('user')}
+
+    slots = next_available(
+        sorted(doctors), start_date, horizon_days, limit,
+        not_before=timezone.localtime().replace(tzinfo=None) if start_date <= date_cls.today() else None,
+    )
+
+    return Response({
+        'specialization': specialization,
+        'results': [
+            {
+                'doctor': {
+                    'id': doctor_id,
+                    'name': doctors[doctor_id].user.full_name,
+                    'specialization': doctors[doctor_id].specialization,
+                    'experience': doctors[doctor_id].experience,
+                    'consultation_fee': doctors[doctor_id].consultation_fee,
+                },
+                'date': start.date().isoformat(),
+                'start_time': start.strftime('%H:%M'),
+                'end_time': end.strftime('%H:%M'),
+            }
+            for doctor_id, start, end in slots
+        ]
+    })
+
 class TimeSlotListCreateView(generics.ListCreateAPIView):
     serializer_class = TimeSlotSerializer
     permission_classes = [IsAuthenticated]
@@ -76,8 +129,12 @@ class TimeSlotListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         doctor_id = self.request.query_params.get('doctor_id')
         if doctor_id:
+            if not doctor_id.isdigit():
+                raise ValidationError({'doctor_id': 'Must be an integer'})
             return TimeSlot.objects.filter(doctor_id=doctor_id)
-        return TimeSlot.objects.all()
+        if self.request.user.role == 'doctor':
+            return TimeSlot.objects.filter(doctor__user=self.request.user)
+        raise ValidationError({'doctor_id': 'This parameter is required'})
 
     def perform_create(self, serializer):
         # Ensure the user is a doctor and can only create slots for themselves
@@ -85,4 +142,178 @@ class TimeSlotListCreateView(generics.ListCreateAPIView):
             doctor = Doctor.objects.get(user=self.request.user)
             serializer.save(doctor=doctor)
         else:
-            raise PermissionError("Only doctors can create time slots")
\ No newline at end of file
+            raise PermissionDenied("Only doctors can create time slots")
+
+    def put(self, request, *args, **kwargs):
+        # Replace the doctor's whole weekly schedule in one transaction
+        if not isinstance(request.data, dict):
+            raise ValidationError({'non_field_errors': ['Expected an object with a "slots" list']})
+        if request.user.role == 'doctor':
+            doctor = Doctor.objects.get(user=request.user)
+        elif request.user.role == 'admin':
+            try:
+                doctor = Doctor.objects.get(id=request.data.get('doctor_id'))
+            except (Doctor.DoesNotExist, ValueError, TypeError):
+                raise ValidationError({'doctor_id': 'A valid doctor_id is required'})
+        else:
+            raise PermissionDenied("Only doctors and admins can change schedules")
+
+        serializer = WeeklyScheduleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            # Serialize replacements per doctor; locking only the TimeSlot rows
+            # lets two first-time schedules both insert and collide.
+            doctor = Doctor.objects.select_for_update().get(pk=doctor.pk)
+            changes = replace_weekly_schedule(doctor, serializer.validated_data['slots'])
+            schedule = compile_schedules([doctor.id])[doctor.id]
+            upcoming = doctor.appointments.filter(
+                appointment_date__gte=date_cls.today(),
+                status__in=ACTIVE_STATUSES
+            ).select_related('patient__user').order_by('appointment_date', 'start_time')
+            outside = outside_schedule(schedule, upcoming)
+
+        return Response({
+            'slots': TimeSlotSerializer(
+                doctor.time_slots.order_by('day_of_week', 'start_time'), many=True
+            ).data,
+            'changes': changes,
+            'appointments_outside_schedule': [
+                {
+                    'id': appointment.id,
+                    'patient': appointment.patient.user.full_name,
+                    'appointment_date': appointment.appointment_date,
+                    'start_time': appointment.start_time,
+                    'end_time': appointment.end_time,
+                    'status': appointment.status,
+                }
+                for appointment in outside
+            ],
+        })
+
+def _authenticate_stream(request):
+    # EventSource cannot send headers, so also accept the access token as a
+    # query parameter.
+    authenticator = RevocableJWTAuthentication()
+    raw_token = request.GET.get('token')
+    if raw_token:
+        validated_token = authenticator.get_validated_token(raw_token)
+        return authenticator.get_user(validated_token)
+    result = authenticator.authenticate(request)
+    return result[0] if result else None
+
+async def doctor_slot_events(request, doctor_id):
+    options = getattr(settings, 'SLOT_EVENTS', {})
+
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would consume the endless stream synchronously and hang.
+        return JsonResponse(
+            {'error': 'Slot events are only served by the ASGI application'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+
+    try:
+        user = await sync_to_async(_authenticate_stream)(request)
+    except AuthenticationFailed as exc:
+        return JsonResponse({'error': str(exc.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if user is None or not user.is_active:
+        return JsonResponse({'error': 'Authentication credentials were not provided'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    if not await Doctor.objects.filter(id=doctor_id).aexists():
+        return JsonResponse({'error': 'Doctor not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        start_date = datetime.strptime(request.GET['start'], '%Y-%m-%d').date() if 'start' in request.GET else date_cls.today()
+        end_date = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if 'end' in request.GET else start_date
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+    max_range_days = options.get('MAX_RANGE_DAYS', 31)
+    if end_date < start_date or (end_date - start_date).days > max_range_days:
+        return JsonResponse(
+            {'error': f'end must be on or after start and at most {max_range_days} days later'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    heartbeat = options.get('HEARTBEAT_SECONDS', 15)
+    max_stream_seconds = options.get('MAX_STREAM_SECONDS', 300)
+
+    async def stream():
+        # Django 4.2 does not notice client disconnects on streaming
+        # responses, so every stream ends after MAX_STREAM_SECONDS and the
+        # EventSource reconnects; abandoned streams are released that way.
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_stream_seconds
+        subscription = get_broker().subscribe(doctor_id, start_date, end_date)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                try:
+                    event = await subscription.get(timeout=min(heartbeat, remaining))
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+class ScheduleExceptionListCreateView(generics.ListCreateAPIView):
+    serializer_class = ScheduleExceptionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = ScheduleException.objects.all()
+        if user.role == 'doctor':
+            queryset = queryset.filter(doctor__user=user)
+        else:
+            doctor_id = self.request.query_params.get('doctor_id')
+            if not doctor_id:
+                raise ValidationError({'doctor_id': 'This parameter is required'})
+            if not doctor_id.isdigit():
+                raise ValidationError({'doctor_id': 'Must be an integer'})
+            queryset = queryset.filter(doctor_id=doctor_id)
+
+        date_from = self.request.query_params.get('date_from')
+        if date_from:
+            try:
+                date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
+            except ValueError:
+                raise ValidationError({'date_from': 'Invalid date format. Use YYYY-MM-DD'})
+            queryset = queryset.filter(date__gte=date_from)
+        return queryset
+
+    def perform_create(self, serializer):
+        # Doctors manage their own leave and extra clinics; admins may do it
+        # for any doctor by passing doctor_id.
+        user = self.request.user
+        if user.role == 'doctor':
+            doctor = Doctor.objects.get(user=user)
+        elif user.role == 'admin':
+            try:
+                doctor = Doctor.objects.get(id=self.request.data.get('doctor_id'))
+            except (Doctor.DoesNotExist, ValueError, TypeError):
+                raise ValidationError({'doctor_id': 'A valid doctor_id is required'})
+        else:
+            raise PermissionDenied("Only doctors and admins can change schedules")
+        serializer.save(doctor=doctor)
+
+class ScheduleExceptionDetailView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = ScheduleExceptionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'doctor':
+            return ScheduleException.objects.filter(doctor__user=user)
+        elif user.role == 'admin':
+            return ScheduleException.objects.all()
+        return ScheduleException.objects.none()
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""Idempotency-Key support for POST endpoints that clients retry.
+
+The first response to a (user, method, path, key) combination is kept in the
+cache and replayed for retries, so a retried booking or notification trigger
+never runs the view again. A short lock makes concurrent duplicates wait for
+the first request instead of racing it: they get 409 and may retry.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+CACHE_PREFIX = 'idempotency'
+MAX_KEY_LENGTH = 255
+
+
+def _options():
+    options = getattr(settings, 'IDEMPOTENCY', {})
+    return options.get('TTL_SECONDS', 24 * 60 * 60), options.get('LOCK_SECONDS', 30)
+
+
+def _fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(stored, fingerprint):
+    if stored['fingerprint'] != fingerprint:
+        return Response(
+            {'error': f'{HEADER} was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    headers = dict(stored['headers'], **{REPLAYED_HEADER: 'true'})
+    return Response(stored['data'], status=stored['status'], headers=headers)
+
+
+def idempotent(view):
+    """Replay the stored response when a request repeats its Idempotency-Key.
+
+    Wraps a DRF handler taking ``(request, *args, **kwargs)``; use
+    ``method_decorator`` on class-based views. Requests without the header
+    run as usual. Server errors and exceptions raised by the view (which DRF
+    turns into error responses later) are not stored, so those re-run.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        ttl, lock_seconds = _options()
+        scope = hashlib.sha256(f'{request.user.pk}:{request.method}:{request.path}:{key}'.encode()).hexdigest()
+        result_key = f'{CACHE_PREFIX}:{scope}'
+        lock_key = f'{CACHE_PREFIX}:lock:{scope}'
+        fingerprint = _fingerprint(request)
+
+        stored = cache.get(result_key)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+        if not cache.add(lock_key, 1, timeout=lock_seconds):
+            return Response(
+                {'error': f'A request with this {HEADER} is still in progress'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        try:
+            # The first request may have finished between the get and the add.
+            stored = cache.get(result_key)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+            response = view(request, *args, **kwargs)
+            if response.status_code < 500:
+                cache.set(result_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                    'headers': {name: response[name] for name in ('Location',) if response.has_header(name)},
+                }, timeout=ttl)
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    return wrapper
@@ -0,0 +1,146 @@
+"""Non-blocking file logging.
+
+Request threads and Celery workers only put records on an in-memory queue; a
+background QueueListener formats them as JSON and writes them to a rotating
+file. Nothing touches the filesystem until the first record is logged.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import (
+    QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler, WatchedFileHandler,
+)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        if record.stack_info:
+            payload['stack'] = self.formatStack(record.stack_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        return json.dumps(payload, default=str)
+
+
+class QueuedFileHandler(QueueHandler):
+    """QueueHandler that starts its file-writing listener on first use.
+
+    By default every process appends to the one file through a
+    WatchedFileHandler and logrotate (or similar) rotates it; several worker
+    processes must not rotate a shared file themselves. With
+    ``external_rotation=False`` the handler rotates the file itself, by size
+    or, given ``when`` (e.g. ``'midnight'``), by time. Only do that when a
+    single process writes the file.
+
+    When the queue is full, records are dropped rather than blocking the
+    caller, and a warning with the drop count is logged once there is room
+    again. A process forked after logging starts its own listener, since the
+    parent's thread does not survive the fork.
+    """
+
+    def __init__(self, filename, when=None, interval=1, max_bytes=50 * 1024 * 1024,
+                 backup_count=10, queue_size=10000, encoding='utf-8', external_rotation=True):
+        super().__init__(queue.Queue(queue_size))
+        self.filename = os.fspath(filename)
+        self.when = when
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue_size = queue_size
+        self.encoding = encoding
+        self.external_rotation = external_rotation
+        self.dropped = 0
+        self._listener = None
+        self._target = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _build_target(self):
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        if self.external_rotation:
+            target = WatchedFileHandler(self.filename, encoding=self.encoding)
+        elif self.when:
+            target = TimedRotatingFileHandler(
+                self.filename, when=self.when, interval=self.interval,
+                backupCount=self.backup_count, encoding=self.encoding, utc=True,
+            )
+        else:
+            target = RotatingFileHandler(
+                self.filename, maxBytes=self.max_bytes,
+                backupCount=self.backup_count, encoding=self.encoding,
+            )
+        target.setFormatter(self.formatter or JsonFormatter())
+        return target
+
+    def _start(self):
+        pid = os.getpid()
+        if self._pid is not None and self._pid != pid:
+            # Forked child: the inherited listener has no thread behind it and
+            # the inherited lock and queue may be in any state.
+            self._start_lock = threading.Lock()
+            self.queue = queue.Queue(self.queue_size)
+            self._listener = None
+            self._target = None
+            self.dropped = 0
+        with self._start_lock:
+            if self._listener is not None and self._pid == pid:
+                return
+            self._target = self._build_target()
+            self._listener = QueueListener(self.queue, self._target)
+            self._listener.start()
+            if self._pid is None:
+                atexit.register(self.close)
+            self._pid = pid
+
+    def prepare(self, record):
+        # Only freeze what may change after this call returns; JSON formatting
+        # happens on the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._listener is None or self._pid != os.getpid():
+            self._start()
+        try:
+            if self.dropped:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f'Log queue was full; dropped {self.dropped} records',
+                }))
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        with self._start_lock:
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+            self._target.close()
+        super().close()
@@ -0,0 +1,528 @@
+"""Request, database, cache and Celery metrics in Prometheus format.
+
+Every process records into its own registry. A background thread in each web
+process adds what it recorded since the last flush to Redis hashes in the
+default cache every METRICS_FLUSH_SECONDS, and /metrics reads the totals
+back, so whichever worker answers a scrape reports the whole deployment.
+Without a Redis cache (tests, local runs) the endpoint renders the answering
+process's own registry. Celery tasks write their timings to the cache as
+they finish.
+"""
+import atexit
+import bisect
+import contextvars
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery import current_app
+from celery.signals import task_prerun, task_postrun
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+SHARED_KEY_PREFIX = 'metrics:web'
+CELERY_KEY_PREFIX = 'metrics:celery'
+CELERY_TASK_PREFIX = 'notifications.'
+CELERY_STATES = ('SUCCESS', 'FAILURE', 'RETRY')
+
+_current_request = contextvars.ContextVar('metrics_request', default=None)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in pairs)
+    return '{' + body + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# Metrics hand their state around as "fields": {(labels, slot): number}, where
+# slot is 'value' for a counter and a bucket index or 'sum' for a histogram.
+# That is also the layout of the shared Redis hashes.
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def fields(self, reset=False):
+        with self._lock:
+            values = self._values
+            self._values = {} if reset else dict(values)
+        return {(labels, 'value'): value for labels, value in values.items()}
+
+    def merge(self, fields):
+        for (labels, _), value in fields.items():
+            self.inc(labels, value)
+
+    def samples(self, fields):
+        for (labels, _), value in sorted(fields.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _state(self, labels):
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        return state
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._state(labels)
+            state[0][index] += 1
+            state[1] += value
+
+    def fields(self, reset=False):
+        with self._lock:
+            values = self._values
+            self._values = {} if reset else {
+                labels: [list(counts), total] for labels, (counts, total) in values.items()
+            }
+        fields = {}
+        for labels, (counts, total) in values.items():
+            fields.update(((labels, index), count) for index, count in enumerate(counts) if count)
+            fields[labels, 'sum'] = total
+        return fields
+
+    def merge(self, fields):
+        with self._lock:
+            for (labels, slot), value in fields.items():
+                state = self._state(labels)
+                if slot == 'sum':
+                    state[1] += value
+                else:
+                    state[0][slot] += value
+
+    def samples(self, fields):
+        series = {}
+        for (labels, slot), value in fields.items():
+            counts, total = series.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            if slot == 'sum':
+                total[0] += value
+            else:
+                counts[slot] += value
+        for labels, (counts, total) in sorted(series.items()):
+            yield from histogram_samples(self.name, self.labelnames, labels, self.buckets, counts, total[0])
+
+
+def histogram_samples(name, labelnames, labels, buckets, counts, total):
+    cumulative = 0
+    for bound, count in zip(buckets + ('+Inf',), counts):
+        cumulative += count
+        le = bound if bound == '+Inf' else _format_value(bound)
+        yield f'{name}_bucket{_format_labels(labelnames, labels, [("le", le)])} {cumulative}'
+    yield f'{name}_sum{_format_labels(labelnames, labels)} {_format_value(total)}'
+    yield f'{name}_count{_format_labels(labelnames, labels)} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self, fields_by_metric=None):
+        """Render ``fields_by_metric`` (name -> fields), or the local values."""
+        lines = []
+        for metric in self.metrics:
+            if fields_by_metric is None:
+                fields = metric.fields()
+            else:
+                fields = fields_by_metric.get(metric.name, {})
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples(fields))
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    'http_request_duration_seconds', 'Request latency by route.',
+    ('method', 'route', 'status'),
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    'http_request_db_queries', 'Database queries issued per request.',
+    ('method', 'route'), buckets=QUERY_COUNT_BUCKETS,
+))
+REQUEST_DB_TIME = registry.register(Histogram(
+    'http_request_db_duration_seconds', 'Time spent in the database per request.',
+    ('method', 'route'),
+))
+REQUEST_SERIALIZER_TIME = registry.register(Histogram(
+    'http_request_serializer_duration_seconds', 'Time spent serializing responses per request.',
+    ('method', 'route'),
+))
+DB_QUERY_LATENCY = registry.register(Histogram(
+    'db_query_duration_seconds', 'Latency of individual database queries.',
+    ('alias',),
+))
+CACHE_REQUESTS = registry.register(Counter(
+    'cache_requests_total', 'Cache lookups by result.',
+    ('operation', 'result'),
+))
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+def _db_wrapper(alias):
+    labels = (alias,)
+
+    def wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_QUERY_LATENCY.observe(labels, elapsed)
+            stats = _current_request.get()
+            if stats is not None:
+                stats.queries += 1
+                stats.db_time += elapsed
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    # Async-capable so ASGI requests (including the SSE view) do not pay a
+    # thread switch to pass through it.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.metrics_path = getattr(settings, 'METRICS_PATH', '/metrics')
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if request.path == self.metrics_path:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            with self.wrap_connections():
+                response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if request.path == self.metrics_path:
+            return await self.get_response(request)
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            with self.wrap_connections():
+                response = await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def wrap_connections(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(_db_wrapper(connection.alias)))
+        return stack
+
+    def record(self, request, response, stats, elapsed):
+        _flusher.ensure_started()
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        labels = (request.method, route)
+        REQUEST_LATENCY.observe(labels + (response.status_code,), elapsed)
+        REQUEST_QUERIES.observe(labels, stats.queries)
+        REQUEST_DB_TIME.observe(labels, stats.db_time)
+        REQUEST_SERIALIZER_TIME.observe(labels, stats.serializer_time)
+
+
+class TimedSerializerMixin:
+    """Adds the outermost serializer's to_representation time to the request."""
+
+    def to_representation(self, instance):
+        stats = _current_request.get()
+        if stats is None or stats.serializing:
+            return super().to_representation(instance)
+        stats.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializing = False
+            stats.serializer_time += time.perf_counter() - start
+
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        CACHE_REQUESTS.inc(('get', 'miss' if value is _MISSING else 'hit'))
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        CACHE_REQUESTS.inc(('get_many', 'hit'), len(found))
+        CACHE_REQUESTS.inc(('get_many', 'miss'), len(keys) - len(found))
+        return found
+
+
+class MetricsRedisCache(CacheMetricsMixin, RedisCache):
+    pass
+
+
+# Cross-process aggregation. Each web process adds the values recorded since
+# its last flush to one Redis hash per metric; scrapes read the hashes.
+
+def _shared_client():
+    """Redis client behind the default cache, or None if it is not Redis."""
+    backend = caches['default']
+    if not isinstance(backend, RedisCache):
+        return None
+    return backend._cache.get_client(write=True)
+
+
+def _shared_key(metric):
+    return caches['default'].make_key(f'{SHARED_KEY_PREFIX}:{metric.name}')
+
+
+def flush_metrics():
+    """Move this process's unflushed values into the shared hashes."""
+    client = _shared_client()
+    if client is None:
+        return
+    pending = [(metric, metric.fields(reset=True)) for metric in registry.metrics]
+    try:
+        pipe = client.pipeline(transaction=False)
+        for metric, fields in pending:
+            key = _shared_key(metric)
+            for (labels, slot), value in fields.items():
+                field = json.dumps([list(labels), slot])
+                if isinstance(value, float):
+                    pipe.hincrbyfloat(key, field, value)
+                else:
+                    pipe.hincrby(key, field, value)
+        pipe.execute()
+    except Exception:
+        # Keep the values for the next flush rather than losing them.
+        for metric, fields in pending:
+            metric.merge(fields)
+        raise
+
+
+def read_shared_metrics():
+    """Totals from the shared hashes as {metric name: fields}, or None without Redis."""
+    client = _shared_client()
+    if client is None:
+        return None
+    pipe = client.pipeline(transaction=False)
+    for metric in registry.metrics:
+        pipe.hgetall(_shared_key(metric))
+    result = {}
+    for metric, raw in zip(registry.metrics, pipe.execute()):
+        fields = result[metric.name] = {}
+        for field, value in raw.items():
+            labels, slot = json.loads(field)
+            fields[tuple(labels), slot] = float(value) if slot == 'sum' else int(value)
+    return result
+
+
+class _Flusher:
+    """Per-process daemon thread that calls flush_metrics periodically."""
+
+    def __init__(self):
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        if self._pid is not None:
+            # Forked child: the thread did not survive, the lock may be held,
+            # and the inherited values are the parent's to flush.
+            self._lock = threading.Lock()
+            for metric in registry.metrics:
+                metric.fields(reset=True)
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is None:
+                atexit.register(self.flush)
+            self._pid = pid
+            threading.Thread(target=self._run, name='metrics-flush', daemon=True).start()
+
+    def _run(self):
+        interval = getattr(settings, 'METRICS_FLUSH_SECONDS', 10)
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(interval)
+            self.flush()
+
+    def flush(self):
+        try:
+            flush_metrics()
+        except Exception:
+            logger.warning('Could not flush metrics to the cache', exc_info=True)
+
+
+_flusher = _Flusher()
+
+
+# Celery task timings. Workers write aggregated buckets to the shared cache
+# (three increments per task) and the web endpoint reads them back on scrape.
+
+_task_started = {}
+
+
+def _celery_key(task_name, state, suffix):
+    return f'{CELERY_KEY_PREFIX}:{task_name}:{state}:{suffix}'
+
+
+def _cache_incr(key, amount):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.set(key, amount, timeout=None)
+
+
+@task_prerun.connect
+def _task_prerun(task_id=None, task=None, **kwargs):
+    if task is not None and task.name.startswith(CELERY_TASK_PREFIX):
+        _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    start = _task_started.pop(task_id, None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    index = bisect.bisect_left(LATENCY_BUCKETS, elapsed)
+    try:
+        _cache_incr(_celery_key(task.name, state, f'bucket:{index}'), 1)
+        _cache_incr(_celery_key(task.name, state, 'sum_us'), int(elapsed * 1_000_000))
+    except Exception:
+        # Metrics must never fail a task.
+        pass
+
+
+def collect_celery_metrics():
+    name = 'celery_task_duration_seconds'
+    yield f'# HELP {name} Celery task run time by task and final state.'
+    yield f'# TYPE {name} histogram'
+    task_names = sorted(name for name in current_app.tasks if name.startswith(CELERY_TASK_PREFIX))
+    series = [(task_name, state) for task_name in task_names for state in CELERY_STATES]
+    keys = {}
+    for task_name, state in series:
+        keys[task_name, state] = [
+            _celery_key(task_name, state, f'bucket:{i}') for i in range(len(LATENCY_BUCKETS) + 1)
+        ] + [_celery_key(task_name, state, 'sum_us')]
+    try:
+        values = cache.get_many([key for series_keys in keys.values() for key in series_keys])
+    except Exception:
+        return
+    for task_name, state in series:
+        series_keys = keys[task_name, state]
+        counts = [values.get(key, 0) for key in series_keys[:-1]]
+        if not any(counts):
+            continue
+        total = values.get(series_keys[-1], 0) / 1_000_000
+        yield from histogram_samples(name, ('task', 'state'), (task_name, state), LATENCY_BUCKETS, counts, total)
+
+
+registry.register_collector(collect_celery_metrics)
+
+
+def _metrics_allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        return hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, 'METRICS_ALLOWED_NETWORKS', ())
+    )
+
+
+def metrics_view(request):
+    if not _metrics_allowed(request):
+        return HttpResponse(status=401 if getattr(settings, 'METRICS_TOKEN', '') else 403)
+    _flusher.ensure_started()
+    try:
+        flush_metrics()
+        shared = read_shared_metrics()
+    except Exception:
+        logger.warning('Could not read metrics from the cache', exc_info=True)
+        return HttpResponse(status=503)
+    return HttpResponse(registry.render(shared), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -38,11 +39,13 @@ LOCAL_APPS = [
     'doctors',
     'patients',
     'notifications',
+    'waitlist',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'hospital_booking.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -72,6 +75,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'hospital_booking.wsgi.application'
+ASGI_APPLICATION = 'hospital_booking.asgi.application'
 
 # Database
 DATABASES = {
@@ -85,6 +89,14 @@ DATABASES = {
     }
 }
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'hospital_booking.metrics.MetricsRedisCache',
+        'LOCATION': config('CACHE_URL', default='redis://localhost:6379/2'),
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -124,7 +136,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.RevocableJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -165,6 +177,19 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.RevocableTokenRefreshSerializer',
+}
+
+# Revoked JWTs are kept in the cache (see accounts/tokens.py). Other processes
+# notice a revocation within SYNC_INTERVAL seconds; the worker that revoked a
+# token, and refresh-token rotation itself, see it immediately.
+JWT_REVOCATION = {
+    'SYNC_INTERVAL': 1.0,
+    'BUCKET_SECONDS': 6 * 60 * 60,
+    'BUCKET_CAPACITY': 100000,
+    'ERROR_RATE': 0.001,
+    # Longest-lived token that can be revoked; bounds the log a process replays.
+    'MAX_TOKEN_LIFETIME': int(SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()),
 }
 
 # CORS Configuration
@@ -176,6 +201,8 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
 
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -194,6 +221,63 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Live slot events (server-sent events). The stream view is async, so serve it
+# from an ASGI worker (uvicorn hospital_booking.asgi:application); under WSGI
+# it answers 501. InProcessBroker only reaches streams in the same process.
+SLOT_EVENTS = {
+    'BACKEND': config('SLOT_EVENTS_BACKEND', default='appointments.events.RedisBroker'),
+    'URL': config('SLOT_EVENTS_REDIS_URL', default='redis://localhost:6379/1'),
+    'CHANNEL_PREFIX': 'slot-events:',
+    'HEARTBEAT_SECONDS': 15,
+    # Streams end after this long and the client reconnects, which also
+    # releases streams whose client went away without Django noticing.
+    'MAX_STREAM_SECONDS': 300,
+    'MAX_QUEUE': 100,
+    'MAX_RANGE_DAYS': 31,
+}
+
+# Waitlist backfill: how long a freed slot is held for the offered patient,
+# and the longest date range a single waitlist request may cover.
+WAITLIST = {
+    'HOLD_MINUTES': 15,
+    'MAX_DAYS': 60,
+}
+
+# Serve the doctor's patient roster from maintained care relations. Turn off
+# to fall back to an EXISTS query over appointments (e.g. while running
+# "manage.py rebuild_care_relations" after a bulk import).
+PATIENT_ROSTER_USE_CARE_RELATIONS = config('PATIENT_ROSTER_USE_CARE_RELATIONS', default=True, cast=bool)
+
+# Monthly appointment partitions (PostgreSQL; see "manage.py appointment_partitions").
+# Run "create" at least monthly so upcoming dates never land in the default
+# partition; "archive" writes partitions older than ARCHIVE_AFTER_MONTHS to
+# gzipped CSV under ARCHIVE_DIR and drops them, keeping their counts in care
+# relations. The appointment list shows LIST_HISTORY_DAYS of history unless
+# the client passes appointment_date bounds, so it only reads recent partitions.
+APPOINTMENT_PARTITIONS = {
+    'MONTHS_AHEAD': 6,
+    'LIST_HISTORY_DAYS': 365,
+    'ARCHIVE_AFTER_MONTHS': config('APPOINTMENT_ARCHIVE_AFTER_MONTHS', default=24, cast=int),
+    'ARCHIVE_DIR': config('APPOINTMENT_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'appointments')),
+}
+
+# Idempotency-Key handling for retried POSTs (see hospital_booking/idempotency.py):
+# how long a first response is replayed, and how long a request holds its key.
+IDEMPOTENCY = {
+    'TTL_SECONDS': 24 * 60 * 60,
+    'LOCK_SECONDS': 30,
+}
+
+# Metrics (Prometheus text format). Scrapers send "Authorization: Bearer
+# <METRICS_TOKEN>"; without a token, /metrics only answers clients in
+# METRICS_ALLOWED_NETWORKS (comma-separated CIDRs) and is closed by default.
+# Web workers add their counts to the default cache every METRICS_FLUSH_SECONDS
+# so any worker can answer a scrape for all of them.
+METRICS_PATH = '/metrics'
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_ALLOWED_NETWORKS = config('METRICS_ALLOWED_NETWORKS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=10, cast=int)
+
 # Supabase Configuration
 SUPABASE_URL = config('SUPABASE_URL', default='')
 SUPABASE_KEY = config('SUPABASE_KEY', default='')
@@ -206,15 +290,32 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
-# Logging
+# Logging. File output goes through a queue to a background writer thread,
+# and the log directory is only created when the first record is written.
+# All processes append to one django.log for logrotate to rotate. Set
+# LOG_ROTATE_EXTERNALLY=False to rotate in-process, for single-process setups only.
+LOG_DIR = config('LOG_DIR', default=str(BASE_DIR / 'logs'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'hospital_booking.log.JsonFormatter',
+        },
+    },
     'handlers': {
         'file': {
+            # A factory, not 'class': from Python 3.12 dictConfig expects a
+            # 'handlers' list for any QueueHandler subclass given as 'class'.
+            '()': 'hospital_booking.log.QueuedFileHandler',
             'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'django.log',
+            'filename': os.path.join(LOG_DIR, 'django.log'),
+            'formatter': 'json',
+            'when': config('LOG_ROTATE_WHEN', default='') or None,
+            'max_bytes': config('LOG_MAX_BYTES', default=50 * 1024 * 1024, cast=int),
+            'backup_count': config('LOG_BACKUP_COUNT', default=10, cast=int),
+            'external_rotation': config('LOG_ROTATE_EXTERNALLY', default=True, cast=bool),
         },
         'console': {
             'level': 'INFO',
@@ -225,7 +326,4 @@ LOGGING = {
         'handlers': ['console', 'file'],
         'level': 'INFO',
     },
-}
-
-# Create logs directory
-os.makedirs(BASE_DIR / 'logs', exist_ok=True)
\ No newline at end of file
+}
\ No newline at end of file
@@ -0,0 +1,59 @@
+import logging
+import logging.config
+import tempfile
+
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from hospital_booking.log import QueuedFileHandler
+from hospital_booking.metrics import Histogram, metrics_view
+
+
+class LoggingConfigTests(SimpleTestCase):
+    def tearDown(self):
+        # Put back the configuration Django applied at startup.
+        logging.config.dictConfig(settings.LOGGING)
+
+    def test_settings_logging_config_applies(self):
+        config = dict(settings.LOGGING)
+        with tempfile.TemporaryDirectory() as log_dir:
+            config['handlers'] = dict(config['handlers'])
+            config['handlers']['file'] = dict(config['handlers']['file'], filename=f'{log_dir}/django.log')
+            logging.config.dictConfig(config)
+            handlers = [handler for handler in logging.getLogger().handlers if isinstance(handler, QueuedFileHandler)]
+            self.assertEqual(len(handlers), 1)
+            logging.getLogger('hospital_booking.tests').info('configured')
+            handlers[0].close()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MetricsViewTests(SimpleTestCase):
+    def scrape(self, **extra):
+        return metrics_view(RequestFactory().get('/metrics', **extra))
+
+    @override_settings(METRICS_TOKEN='', METRICS_ALLOWED_NETWORKS=[])
+    def test_closed_without_token_or_networks(self):
+        self.assertEqual(self.scrape().status_code, 403)
+
+    @override_settings(METRICS_TOKEN='', METRICS_ALLOWED_NETWORKS=['10.0.0.0/8'])
+    def test_allowed_networks(self):
+        self.assertEqual(self.scrape(REMOTE_ADDR='10.1.2.3').status_code, 200)
+        self.assertEqual(self.scrape(REMOTE_ADDR='203.0.113.7').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret', METRICS_ALLOWED_NETWORKS=['127.0.0.0/8'])
+    def test_token_required_when_set(self):
+        self.assertEqual(self.scrape().status_code, 401)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+
+class HistogramFieldsTests(SimpleTestCase):
+    def test_drained_fields_merge_back(self):
+        histogram = Histogram('test_seconds', 'Test.', ('route',))
+        histogram.observe(('a',), 0.02)
+        histogram.observe(('a',), 3.0)
+        expected = list(histogram.samples(histogram.fields()))
+
+        fields = histogram.fields(reset=True)
+        self.assertEqual(histogram.fields(), {})
+        histogram.merge(fields)
+        self.assertEqual(list(histogram.samples(histogram.fields())), expected)
+        self.assertIn('test_seconds_count{route="a"} 2', expected)
@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,10 +12,14 @@ urlpatterns = [
     path('api/patients/', include('patients.urls')),
     path('api/appointments/', include('appointments.urls')),
     path('api/notifications/', include('notifications.urls')),
+    path('api/waitlist/', include('waitlist.urls')),
     
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+
+    # Monitoring
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
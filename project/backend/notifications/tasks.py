@@ -3,6 +3,7 @@ from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from appointments.models import Appointment
+from hospital_booking import metrics  # noqa: F401  (records task timings)
 
 @shared_task
 def send_appointment_confirmation(appointment_id):
@@ -72,6 +73,42 @@ def send_appointment_reminder(appointment_id):
     except Exception as e:
         return f"Failed to send reminder email: {str(e)}"
 
+@shared_task
+def send_slot_offer(offer_id):
+    from waitlist.models import SlotOffer
+
+    try:
+        offer = SlotOffer.objects.select_related(
+            'patient__user', 'doctor__user'
+        ).get(id=offer_id)
+        
+        subject = f'A slot opened up - {offer.appointment_date} at {offer.start_time}'
+        
+        context = {
+            'offer': offer,
+            'patient_name': offer.patient.user.full_name,
+            'doctor_name': offer.doctor.user.full_name,
+        }
+        
+        html_message = render_to_string('emails/slot_offer.html', context)
+        plain_message = render_to_string('emails/slot_offer.txt', context)
+        
+        send_mail(
+            subject=subject,
+            message=plain_message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[offer.patient.user.email],
+            html_message=html_message,
+            fail_silently=False,
+        )
+        
+        return f"Slot offer email sent for offer {offer_id}"
+        
+    except SlotOffer.DoesNotExist:
+        return f"Slot offer {offer_id} not found"
+    except Exception as e:
+        return f"Failed to send slot offer email: {str(e)}"
+
 @shared_task
 def send_daily_appointment_reminders():
     from datetime import date, timedelta
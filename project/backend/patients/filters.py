@@ -0,0 +1,66 @@
+from datetime import date
+
+import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import Func, IntegerField
+from rest_framework.filters import OrderingFilter
+
+SEARCH_CONFIG = 'english'
+# Age bounds outside this range would turn into dates before year 1.
+MAX_AGE = 150
+# Must match the expression of the GIN index on Patient for the index to be used.
+CLINICAL_SEARCH_VECTOR = SearchVector('allergies', 'medical_history', config=SEARCH_CONFIG)
+
+
+class Age(Func):
+    """Completed years since a date, computed by Postgres."""
+    template = "DATE_PART('year', AGE(%(expressions)s))::integer"
+    output_field = IntegerField()
+
+
+def years_ago(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        # 29 February in a non-leap year
+        return today.replace(year=today.year - years, day=28)
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    pass
+
+
+class PatientFilter(django_filters.FilterSet):
+    """Cohort filters for the patient list.
+
+    Age bounds become date_of_birth ranges so they use the index instead of
+    computing every patient's age; ``q`` is a full-text search over allergies
+    and medical history.
+    """
+    min_age = django_filters.NumberFilter(method='filter_min_age', min_value=0, max_value=MAX_AGE)
+    max_age = django_filters.NumberFilter(method='filter_max_age', min_value=0, max_value=MAX_AGE)
+    blood_group = CharInFilter(field_name='blood_group', lookup_expr='in')
+    q = django_filters.CharFilter(method='filter_search')
+
+    def filter_min_age(self, queryset, name, value):
+        return queryset.filter(date_of_birth__lte=years_ago(date.today(), int(value)))
+
+    def filter_max_age(self, queryset, name, value):
+        return queryset.filter(date_of_birth__gt=years_ago(date.today(), int(value) + 1))
+
+    def filter_search(self, queryset, name, value):
+        return queryset.annotate(clinical_search=CLINICAL_SEARCH_VECTOR).filter(
+            clinical_search=SearchQuery(value, config=SEARCH_CONFIG, search_type='websearch')
+        )
+
+
+class PatientOrderingFilter(OrderingFilter):
+    """DRF ordering that accepts ``age`` for the SQL-annotated age."""
+    aliases = {'age': 'annotated_age'}
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        fields = [
+            ('-' if term.startswith('-') else '') + self.aliases.get(term.lstrip('-'), term.lstrip('-'))
+            for term in fields
+        ]
+        return super().remove_invalid_fields(queryset, fields, view, request)
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 
 class Patient(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -11,6 +13,16 @@ class Patient(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_of_birth']),
+            models.Index(fields=['blood_group', 'date_of_birth']),
+            GinIndex(
+                SearchVector('allergies', 'medical_history', config='english'),
+                name='patient_clinical_search_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user.full_name} - Patient"
 
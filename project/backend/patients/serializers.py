@@ -1,10 +1,11 @@
 from rest_framework import serializers
 from accounts.serializers import UserProfileSerializer
+from hospital_booking.metrics import TimedSerializerMixin
 from .models import Patient
 
-class PatientSerializer(serializers.ModelSerializer):
+class PatientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserProfileSerializer(read_only=True)
-    age = serializers.ReadOnlyField()
+    age = serializers.SerializerMethodField()
     
     class Meta:
         model = Patient
@@ -13,7 +14,20 @@ class PatientSerializer(serializers.ModelSerializer):
             'emergency_contact', 'blood_group', 'allergies', 'created_at'
         ]
 
+    def get_age(self, obj) -> int:
+        # Patient lists annotate the age in SQL; nested patients use the property.
+        age = getattr(obj, 'annotated_age', None)
+        return obj.age if age is None else age
+
 class PatientCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Patient
-        fields = ['date_of_birth', 'medical_history', 'emergency_contact', 'blood_group', 'allergies']
\ No newline at end of file
+        fields = ['date_of_birth', 'medical_history', 'emergency_contact', 'blood_group', 'allergies']
+
+class RosterPatientSerializer(PatientSerializer):
+    first_appointment = serializers.DateField(read_only=True)
+    last_appointment = serializers.DateField(read_only=True)
+    appointment_count = serializers.IntegerField(read_only=True)
+
+    class Meta(PatientSerializer.Meta):
+        fields = PatientSerializer.Meta.fields + ['first_appointment', 'last_appointment', 'appointment_count']
\ No newline at end of file
@@ -1,25 +1,85 @@
 from rest_framework import generics
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.db.models import Count, Exists, F, Max, Min, OuterRef, Subquery
+from appointments.care import UNCOUNTED_STATUSES
+from appointments.models import Appointment
+from doctors.models import Doctor
 from .models import Patient
-from .serializers import PatientSerializer, PatientCreateUpdateSerializer
+from .filters import Age, PatientFilter, PatientOrderingFilter
+from datetime import datetime
+from .serializers import PatientSerializer, PatientCreateUpdateSerializer, RosterPatientSerializer
 
 class PatientListView(generics.ListAPIView):
     queryset = Patient.objects.select_related('user')
     serializer_class = PatientSerializer
     permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, PatientOrderingFilter]
+    filterset_class = PatientFilter
+
+    @property
+    def ordering_fields(self):
+        fields = ['annotated_age', 'date_of_birth', 'created_at']
+        user = getattr(self.request, 'user', None)
+        if getattr(user, 'role', None) == 'doctor':
+            fields += ['first_appointment', 'last_appointment', 'appointment_count']
+        return fields
+
+    def get_serializer_class(self):
+        if self.request.user.role == 'doctor':
+            return RosterPatientSerializer
+        return PatientSerializer
 
     def get_queryset(self):
         user = self.request.user
         if user.role == 'admin':
-            return Patient.objects.select_related('user')
+            queryset = Patient.objects.select_related('user').order_by('id')
         elif user.role == 'doctor':
             # Doctors can see patients who have appointments with them
-            return Patient.objects.filter(
-                appointments__doctor__user=user
-            ).distinct().select_related('user')
+            queryset = self.get_roster(user)
         else:
             # Patients can only see their own profile
-            return Patient.objects.filter(user=user).select_related('user')
+            queryset = Patient.objects.filter(user=user).select_related('user')
+        return queryset.annotate(annotated_age=Age('date_of_birth'))
+
+    def get_roster(self, user):
+        doctor_id = Doctor.objects.filter(user=user).values_list('id', flat=True).first()
+        if doctor_id is None:
+            # No doctor profile yet, so no patients; filtering on a NULL id
+            # would match every patient without a care relation instead.
+            return Patient.objects.none()
+        active_since = self.request.query_params.get('active_since')
+
+        if getattr(settings, 'PATIENT_ROSTER_USE_CARE_RELATIONS', True):
+            # One CareRelation row per patient, so no DISTINCT is needed.
+            queryset = Patient.objects.filter(care_relations__doctor_id=doctor_id).annotate(
+                first_appointment=F('care_relations__first_appointment'),
+                last_appointment=F('care_relations__last_appointment'),
+                appointment_count=F('care_relations__appointment_count'),
+            )
+        else:
+            # Fallback while care relations are being rebuilt: a semi-join
+            # instead of joining and de-duplicating every appointment.
+            booked = Appointment.objects.filter(
+                doctor_id=doctor_id, patient=OuterRef('pk')
+            ).exclude(status__in=UNCOUNTED_STATUSES)
+            stats = booked.order_by().values('patient')
+            queryset = Patient.objects.filter(Exists(booked)).annotate(
+                first_appointment=Subquery(stats.annotate(value=Min('appointment_date')).values('value')),
+                last_appointment=Subquery(stats.annotate(value=Max('appointment_date')).values('value')),
+                appointment_count=Subquery(stats.annotate(value=Count('id')).values('value')),
+            )
+
+        if active_since:
+            try:
+                active_since = datetime.strptime(active_since, '%Y-%m-%d').date()
+            except ValueError:
+                raise ValidationError({'active_since': 'Invalid date format. Use YYYY-MM-DD'})
+            queryset = queryset.filter(last_appointment__gte=active_since)
+
+        return queryset.select_related('user').order_by('-last_appointment', 'id')
 
 class PatientDetailView(generics.RetrieveUpdateAPIView):
     queryset = Patient.objects.select_related('user')
@@ -0,0 +1,152 @@
+"""Offering freed slots to waitlisted patients.
+
+When a slot frees up, the best active WaitlistEntry for that doctor and date
+is taken from the partial ``waitlist_queue_idx`` index, and the patient gets
+a SlotOffer that holds the slot for ``WAITLIST['HOLD_MINUTES']``. If the hold
+expires or is declined, the next patient in the queue gets it.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from appointments.models import Appointment
+from doctors.schedule import get_schedule
+from .models import SlotOffer, WaitlistEntry
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+
+class OfferClosed(Exception):
+    pass
+
+
+def _options():
+    return getattr(settings, 'WAITLIST', {})
+
+
+def hold_duration():
+    return timedelta(minutes=_options().get('HOLD_MINUTES', 15))
+
+
+def queue_request(waitlist_request):
+    """Add one queue entry per day in the request's range that the doctor works."""
+    schedule = get_schedule(waitlist_request.doctor_id)
+    entries = [
+        WaitlistEntry(
+            request=waitlist_request,
+            doctor_id=waitlist_request.doctor_id,
+            date=day,
+            priority=waitlist_request.priority,
+            queued_at=waitlist_request.created_at,
+        )
+        for day, intervals in schedule.expand(waitlist_request.date_from, waitlist_request.date_to)
+        if intervals
+    ]
+    WaitlistEntry.objects.bulk_create(entries)
+    return len(entries)
+
+
+def close_request(waitlist_request, status):
+    waitlist_request.status = status
+    waitlist_request.save(update_fields=['status', 'updated_at'])
+    WaitlistEntry.objects.filter(request=waitlist_request, is_active=True).update(is_active=False)
+
+
+def offer_slot(doctor_id, appointment_date, start_time, end_time):
+    """Hold a free slot for the best waiting patient. Returns the offer or None."""
+    now = timezone.now()
+    if appointment_date < timezone.localdate():
+        return None
+
+    try:
+        with transaction.atomic():
+            # Holds whose expiry task has not run yet no longer count.
+            SlotOffer.objects.filter(
+                doctor_id=doctor_id, appointment_date=appointment_date, start_time=start_time,
+                status='held', expires_at__lte=now,
+            ).update(status='expired')
+
+            taken = Appointment.objects.filter(
+                doctor_id=doctor_id,
+                appointment_date=appointment_date,
+                start_time__lt=end_time,
+                end_time__gt=start_time,
+                status__in=ACTIVE_STATUSES,
+            ).exists()
+            if taken:
+                return None
+
+            entry = WaitlistEntry.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                doctor_id=doctor_id, date=appointment_date, is_active=True,
+            ).select_related('request').order_by('-priority', 'queued_at').first()
+            if entry is None:
+                return None
+
+            # One offer per patient per day: if they let it lapse, the next
+            # patient is asked rather than the same one again.
+            entry.is_active = False
+            entry.save(update_fields=['is_active'])
+            offer = SlotOffer.objects.create(
+                entry=entry,
+                patient_id=entry.request.patient_id,
+                doctor_id=doctor_id,
+                appointment_date=appointment_date,
+                start_time=start_time,
+                end_time=end_time,
+                expires_at=now + hold_duration(),
+            )
+            transaction.on_commit(lambda: _notify_and_schedule_expiry(offer))
+    except IntegrityError:
+        # Another worker is already holding this slot for someone.
+        return None
+    return offer
+
+
+def _notify_and_schedule_expiry(offer):
+    from notifications.tasks import send_slot_offer
+    from .tasks import expire_slot_offer
+    send_slot_offer.delay(offer.id)
+    expire_slot_offer.apply_async((offer.id,), countdown=hold_duration().total_seconds())
+
+
+def expire_offer(offer_id):
+    """Expire a lapsed hold and cascade the slot to the next patient."""
+    with transaction.atomic():
+        offer = SlotOffer.objects.select_for_update().filter(id=offer_id, status='held').first()
+        if offer is None or offer.expires_at > timezone.now():
+            return None
+        offer.status = 'expired'
+        offer.save(update_fields=['status', 'updated_at'])
+    return offer_slot(offer.doctor_id, offer.appointment_date, offer.start_time, offer.end_time)
+
+
+def decline_offer(offer):
+    with transaction.atomic():
+        offer = SlotOffer.objects.select_for_update().get(id=offer.id)
+        if not offer.is_open:
+            raise OfferClosed('This offer is no longer open')
+        offer.status = 'declined'
+        offer.save(update_fields=['status', 'updated_at'])
+    return offer_slot(offer.doctor_id, offer.appointment_date, offer.start_time, offer.end_time)
+
+
+def accept_offer(offer):
+    """Book the held slot for the offered patient and close their request."""
+    with transaction.atomic():
+        offer = SlotOffer.objects.select_for_update().select_related('entry__request').get(id=offer.id)
+        if not offer.is_open:
+            raise OfferClosed('This offer is no longer open')
+        waitlist_request = offer.entry.request
+        offer.status = 'accepted'
+        offer.save(update_fields=['status', 'updated_at'])
+        appointment = Appointment.objects.create(
+            patient_id=offer.patient_id,
+            doctor_id=offer.doctor_id,
+            appointment_date=offer.appointment_date,
+            start_time=offer.start_time,
+            end_time=offer.end_time,
+            reason=waitlist_request.reason,
+        )
+        close_request(waitlist_request, 'fulfilled')
+    return appointment
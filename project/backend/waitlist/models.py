@@ -0,0 +1,90 @@
+from django.db import models
+from doctors.models import Doctor
+from patients.models import Patient
+
+class WaitlistRequest(models.Model):
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('fulfilled', 'Fulfilled'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='waitlist_requests')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='waitlist_requests')
+    date_from = models.DateField()
+    date_to = models.DateField()
+    priority = models.PositiveSmallIntegerField(default=0, help_text="Higher is offered first")
+    reason = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='waiting')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.patient.user.full_name} waiting for Dr. {self.doctor.user.full_name} ({self.date_from} - {self.date_to})"
+
+class WaitlistEntry(models.Model):
+    """One day of a WaitlistRequest: a row in the per-doctor/date queue.
+
+    The partial index below makes "best waiting patient for this doctor on
+    this date" a single index seek.
+    """
+    request = models.ForeignKey(WaitlistRequest, on_delete=models.CASCADE, related_name='entries')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='waitlist_entries')
+    date = models.DateField()
+    priority = models.PositiveSmallIntegerField(default=0)
+    queued_at = models.DateTimeField()
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['-priority', 'queued_at']
+        indexes = [
+            models.Index(
+                fields=['doctor', 'date', '-priority', 'queued_at'],
+                condition=models.Q(is_active=True),
+                name='waitlist_queue_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.request} on {self.date}"
+
+class SlotOffer(models.Model):
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('accepted', 'Accepted'),
+        ('declined', 'Declined'),
+        ('expired', 'Expired'),
+    ]
+
+    entry = models.ForeignKey(WaitlistEntry, on_delete=models.CASCADE, related_name='offers')
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='slot_offers')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='slot_offers')
+    appointment_date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='held')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # At most one open hold per slot; also the index for hold lookups.
+            models.UniqueConstraint(
+                fields=['doctor', 'appointment_date', 'start_time'],
+                condition=models.Q(status='held'),
+                name='slot_offer_one_hold_per_slot',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Offer to {self.patient.user.full_name} for {self.appointment_date} {self.start_time}"
+
+    @property
+    def is_open(self):
+        from django.utils import timezone
+        return self.status == 'held' and self.expires_at > timezone.now()
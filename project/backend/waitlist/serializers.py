@@ -0,0 +1,46 @@
+from datetime import timedelta
+from django.conf import settings
+from rest_framework import serializers
+from doctors.models import Doctor
+from .models import WaitlistRequest, SlotOffer
+
+class WaitlistRequestSerializer(serializers.ModelSerializer):
+    doctor_id = serializers.IntegerField()
+    doctor_name = serializers.CharField(source='doctor.user.full_name', read_only=True)
+    patient_name = serializers.CharField(source='patient.user.full_name', read_only=True)
+
+    class Meta:
+        model = WaitlistRequest
+        fields = [
+            'id', 'doctor_id', 'doctor_name', 'patient_name', 'date_from', 'date_to',
+            'priority', 'reason', 'status', 'created_at'
+        ]
+        read_only_fields = ['priority', 'status', 'created_at']
+
+    def validate_doctor_id(self, value):
+        if not Doctor.objects.filter(id=value, is_available=True).exists():
+            raise serializers.ValidationError("Doctor not found")
+        return value
+
+    def validate(self, attrs):
+        from django.utils import timezone
+
+        max_days = getattr(settings, 'WAITLIST', {}).get('MAX_DAYS', 60)
+        if attrs['date_from'] < timezone.localdate():
+            raise serializers.ValidationError("date_from cannot be in the past")
+        if attrs['date_to'] < attrs['date_from']:
+            raise serializers.ValidationError("date_to must be on or after date_from")
+        if attrs['date_to'] - attrs['date_from'] > timedelta(days=max_days):
+            raise serializers.ValidationError(f"A waitlist request can cover at most {max_days} days")
+        return attrs
+
+class SlotOfferSerializer(serializers.ModelSerializer):
+    doctor_name = serializers.CharField(source='doctor.user.full_name', read_only=True)
+    is_open = serializers.ReadOnlyField()
+
+    class Meta:
+        model = SlotOffer
+        fields = [
+            'id', 'doctor_id', 'doctor_name', 'appointment_date', 'start_time', 'end_time',
+            'status', 'is_open', 'expires_at', 'created_at'
+        ]
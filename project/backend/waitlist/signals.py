@@ -0,0 +1,13 @@
+from django.dispatch import receiver
+from django.utils import timezone
+from appointments.signals import slot_freed
+from .tasks import offer_freed_slot
+
+
+@receiver(slot_freed)
+def backfill_freed_slot(sender, doctor_id, appointment_date, start_time, end_time, **kwargs):
+    if appointment_date < timezone.localdate():
+        return
+    offer_freed_slot.delay(
+        doctor_id, appointment_date.isoformat(), start_time.isoformat(), end_time.isoformat()
+    )
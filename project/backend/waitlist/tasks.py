@@ -0,0 +1,22 @@
+from datetime import date, time
+from celery import shared_task
+from .backfill import expire_offer, offer_slot
+
+@shared_task
+def offer_freed_slot(doctor_id, appointment_date, start_time, end_time):
+    offer = offer_slot(
+        doctor_id,
+        date.fromisoformat(appointment_date),
+        time.fromisoformat(start_time),
+        time.fromisoformat(end_time),
+    )
+    if offer is None:
+        return f"No waitlisted patient took doctor {doctor_id}'s slot on {appointment_date} {start_time}"
+    return f"Offered slot to patient {offer.patient_id} (offer {offer.id})"
+
+@shared_task
+def expire_slot_offer(offer_id):
+    offer = expire_offer(offer_id)
+    if offer is None:
+        return f"Offer {offer_id} not expired, or no one else waiting"
+    return f"Offer {offer_id} expired; cascaded to offer {offer.id}"
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.WaitlistRequestListCreateView.as_view(), name='waitlist-list-create'),
+    path('<int:request_id>/cancel/', views.cancel_waitlist_request, name='waitlist-cancel'),
+    path('offers/', views.SlotOfferListView.as_view(), name='slot-offer-list'),
+    path('offers/<int:offer_id>/accept/', views.accept_slot_offer, name='slot-offer-accept'),
+    path('offers/<int:offer_id>/decline/', views.decline_slot_offer, name='slot-offer-decline'),
+]
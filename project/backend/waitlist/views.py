@@ -0,0 +1,114 @@
+from rest_framework import generics, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django.db import IntegrityError, transaction
+from appointments.serializers import AppointmentSerializer
+from patients.models import Patient
+from notifications.tasks import send_appointment_confirmation
+from .backfill import OfferClosed, accept_offer, close_request, decline_offer, queue_request
+from .models import WaitlistRequest, SlotOffer
+from .serializers import WaitlistRequestSerializer, SlotOfferSerializer
+
+class WaitlistRequestListCreateView(generics.ListCreateAPIView):
+    serializer_class = WaitlistRequestSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = WaitlistRequest.objects.select_related('patient__user', 'doctor__user')
+
+        if user.role == 'patient':
+            queryset = queryset.filter(patient__user=user)
+        elif user.role == 'doctor':
+            queryset = queryset.filter(doctor__user=user)
+        elif user.role == 'admin':
+            pass
+
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        return queryset
+
+    def perform_create(self, serializer):
+        if self.request.user.role != 'patient':
+            raise PermissionDenied("Only patients can join a waitlist")
+        patient = Patient.objects.get(user=self.request.user)
+        with transaction.atomic():
+            waitlist_request = serializer.save(patient=patient)
+            queue_request(waitlist_request)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def cancel_waitlist_request(request, request_id):
+    try:
+        waitlist_request = WaitlistRequest.objects.get(id=request_id)
+        
+        user = request.user
+        if user.role == 'patient' and waitlist_request.patient.user != user:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        elif user.role == 'doctor' and waitlist_request.doctor.user != user:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        
+        if waitlist_request.status != 'waiting':
+            return Response({'error': 'Waitlist request is not active'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            close_request(waitlist_request, 'cancelled')
+        
+        return Response({
+            'message': 'Waitlist request cancelled successfully',
+            'waitlist_request': WaitlistRequestSerializer(waitlist_request).data
+        })
+        
+    except WaitlistRequest.DoesNotExist:
+        return Response({'error': 'Waitlist request not found'}, status=status.HTTP_404_NOT_FOUND)
+
+class SlotOfferListView(generics.ListAPIView):
+    serializer_class = SlotOfferSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = SlotOffer.objects.select_related('doctor__user')
+        if user.role == 'patient':
+            return queryset.filter(patient__user=user)
+        elif user.role == 'doctor':
+            return queryset.filter(doctor__user=user)
+        return queryset
+
+def _patient_offer(request, offer_id):
+    return SlotOffer.objects.get(id=offer_id, patient__user=request.user)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def accept_slot_offer(request, offer_id):
+    try:
+        offer = _patient_offer(request, offer_id)
+        appointment = accept_offer(offer)
+    except SlotOffer.DoesNotExist:
+        return Response({'error': 'Offer not found'}, status=status.HTTP_404_NOT_FOUND)
+    except OfferClosed as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    except IntegrityError:
+        return Response({'error': 'This time slot is already booked'}, status=status.HTTP_409_CONFLICT)
+
+    send_appointment_confirmation.delay(appointment.id)
+    return Response({
+        'message': 'Appointment booked from waitlist',
+        'appointment': AppointmentSerializer(appointment).data
+    }, status=status.HTTP_201_CREATED)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def decline_slot_offer(request, offer_id):
+    try:
+        offer = _patient_offer(request, offer_id)
+        decline_offer(offer)
+    except SlotOffer.DoesNotExist:
+        return Response({'error': 'Offer not found'}, status=status.HTTP_404_NOT_FOUND)
+    except OfferClosed as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+
+    return Response({'message': 'Offer declined'})